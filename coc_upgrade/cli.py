@@ -1,40 +1,371 @@
 import argparse
+import json
 from pathlib import Path
+from typing import List, Optional, Sequence
 
-from .crawler import (
-    defenses,
-    resources,
-    army_buildings,
-    troops_elixir,
-    troops_dark,
-    spells_elixir,
-    spells_dark,
-    heroes,
-    siege_machines,
-    building_max_counts,
+from .crawler import CRAWLERS
+from .crawler.api import run_jobs_api
+from .crawler.archive import PageArchive, DEFAULT_ARCHIVE_DIR, reparse
+from .crawler.bench import (
+    DEFAULT_CORPUS_DIR,
+    PARSER_BACKENDS,
+    available_backends,
+    save_corpus,
+    run_benchmarks,
+    compare,
+    write_report,
 )
-from .transform.build_tables import build_th_tables
+from .crawler.base import (
+    CrawlJob,
+    run_jobs,
+    set_cache,
+    get_cache,
+    set_archive,
+    get_archive,
+    install_transport,
+    set_base_url,
+    set_throttle,
+    set_raw_format,
+    RAW_FORMATS,
+    enable_adaptive_pacing,
+    pacing_stats,
+    HedgePolicy,
+    enable_hedging,
+    get_hedging,
+)
+from .crawler.cache import HttpCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from .crawler.checkpoint import CrawlJournal, job_key
+from .crawler.dump import crawl_from_dump
+from .crawler.incremental import crawl_incremental
+from .crawler.jobqueue import JobQueue, DEFAULT_QUEUE_FILE, run_worker
+from .crawler.mockwiki import MockWiki, MockWikiConfig
+from .crawler.pipeline import run_jobs_pipelined
+from .crawler.schedule import crawl_scheduled
+from .crawler.transport import RecordingAdapter, ReplayAdapter
+from .crawler.wikitext import run_jobs_wikitext
+from .transform.build_tables import DEFAULT_ENGINE, WORKBOOK_ENGINES, build_all_th_tables
+
+
+# Backend name -> job runner with the signature of base.run_jobs.
+FETCH_BACKENDS = {
+    "html": run_jobs,
+    "api": run_jobs_api,
+    "wikitext": run_jobs_wikitext,
+    "pipeline": run_jobs_pipelined,
+}
 
 
-def crawl_all(raw_data_dir: Path) -> None:
+def crawl_all(
+    raw_data_dir: Path,
+    workers: int = 1,
+    backend: str = "html",
+    resume: bool = False,
+) -> None:
     raw_data_dir.mkdir(parents=True, exist_ok=True)
     
     print("[INFO] Starting full data crawl...")
     
-    defenses.crawl(raw_data_dir)
-    resources.crawl(raw_data_dir)
-    army_buildings.crawl(raw_data_dir)
-    troops_elixir.crawl(raw_data_dir)
-    troops_dark.crawl(raw_data_dir)
-    spells_elixir.crawl(raw_data_dir)
-    spells_dark.crawl(raw_data_dir)
-    heroes.crawl(raw_data_dir)
-    siege_machines.crawl(raw_data_dir)
-    building_max_counts.crawl(raw_data_dir)
+    journal = CrawlJournal(raw_data_dir)
+    done = journal.load() if resume else {}
+    if not resume:
+        journal.reset()
+    
+    # Run every category's jobs together so workers (or api.php batches)
+    # span category boundaries; results are split back per category.
+    job_groups = [crawler.build_jobs() for crawler in CRAWLERS.values()]
+    jobs = [job for group in job_groups for job in group]
+    pending = [job for job in jobs if job_key(job) not in done]
+    if done:
+        print(f"[INFO] Resuming: {len(jobs) - len(pending)} of {len(jobs)} entities already done")
+    
+    # Row files are written while the crawl runs, each entity as soon as it
+    # is parsed; the rest are saved at the end.
+    streams = {
+        crawler.CATEGORY: crawler.open_stream(raw_data_dir)
+        for crawler in CRAWLERS.values()
+        if hasattr(crawler, "open_stream")
+    }
+    for job in jobs:
+        if job_key(job) in done and job.category in streams:
+            streams[job.category].add(job, done[job_key(job)])
+    
+    def on_result(job: CrawlJob, result) -> None:
+        journal.append(job, result)
+        if job.category in streams:
+            streams[job.category].add(job, result)
+    
+    try:
+        results = FETCH_BACKENDS[backend](pending, workers=workers, on_result=on_result)
+    except BaseException:
+        for stream in streams.values():
+            stream.abort()
+        raise
+    for job, result in zip(pending, results):
+        if result is not None:
+            done[job_key(job)] = result
+    
+    for crawler, group in zip(CRAWLERS.values(), job_groups):
+        if crawler.CATEGORY in streams:
+            streams[crawler.CATEGORY].close()
+        else:
+            crawler.save_results(raw_data_dir, [done.get(job_key(job)) for job in group])
+    
+    failed = sum(1 for job in jobs if job_key(job) not in done)
+    if failed:
+        print(f"[WARN] {failed} entities failed; run again with --resume to retry only those")
+    else:
+        journal.remove()
     
     print("[OK] Completed data crawl.")
 
 
+def select_jobs(
+    categories: Optional[Sequence[str]] = None,
+    entities: Optional[Sequence[str]] = None,
+) -> List[CrawlJob]:
+    """Jobs of ``categories`` (default: all), limited to ``entities`` if given.
+
+    Entity names match case-insensitively against the crawler tables.
+    """
+    selected = list(categories) if categories else list(CRAWLERS)
+    wanted = {name.casefold() for name in entities} if entities else None
+    
+    jobs: List[CrawlJob] = []
+    for category in selected:
+        for job in CRAWLERS[category].build_jobs():
+            if wanted is None or job.name.casefold() in wanted:
+                jobs.append(job)
+    
+    if wanted is not None:
+        found = {job.name.casefold() for job in jobs}
+        for name in entities:
+            if name.casefold() not in found:
+                print(f"[WARN] No entity named {name!r} in: {', '.join(selected)}")
+    return jobs
+
+
+def crawl_selected(
+    raw_data_dir: Path,
+    categories: Optional[Sequence[str]] = None,
+    entities: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    backend: str = "html",
+) -> None:
+    """Re-fetch only the given categories/entities and splice them into raw JSON.
+
+    Every other row of the category files is kept as it is.
+    """
+    raw_data_dir.mkdir(parents=True, exist_ok=True)
+    selected = list(categories) if categories else list(CRAWLERS)
+    jobs = select_jobs(categories, entities)
+    if not jobs:
+        print("[WARN] Nothing to crawl.")
+        return
+    
+    print(f"[INFO] Fetching {len(jobs)} selected entities...")
+    results = FETCH_BACKENDS[backend](jobs, workers=workers)
+    
+    for category in selected:
+        category_jobs = [job for job in jobs if job.category == category]
+        if not category_jobs:
+            continue
+        category_results = [
+            result for job, result in zip(jobs, results) if job.category == category
+        ]
+        CRAWLERS[category].merge_results(raw_data_dir, category_jobs, category_results)
+    
+    failed = sum(1 for result in results if result is None)
+    if failed:
+        print(f"[WARN] {failed} entities failed; their existing rows were kept")
+    print("[OK] Completed partial crawl.")
+
+
+def run_crawl(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.only is not None:
+        args.only = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in args.only if name not in CRAWLERS]
+        if unknown:
+            parser.error(
+                f"unknown categories: {', '.join(unknown)} "
+                f"(choose from {', '.join(CRAWLERS)})"
+            )
+    if args.enqueue:
+        jobs = select_jobs(args.only, args.entity)
+        queue = JobQueue(args.queue)
+        queue.enqueue(jobs)
+        print(f"[OK] Enqueued {len(jobs)} jobs in: {args.queue} ({queue.counts()})")
+        return
+    if args.worker and (args.use_async or args.incremental or args.resume or args.budget is not None
+                        or args.adaptive_pacing or args.backend != "html"):
+        parser.error("--worker fetches leased pages one by one with the html backend; drop the other crawl modes")
+    
+    if args.entity and args.from_dump is not None:
+        parser.error("--entity needs live pages; use --only to limit --from-dump")
+    
+    if args.from_dump is not None:
+        crawl_from_dump(args.from_dump, args.output_dir, categories=args.only)
+        return
+    
+    if (args.only or args.entity) and (args.use_async or args.resume):
+        parser.error("--only/--entity cannot be combined with --async or --resume")
+    if args.entity and args.incremental:
+        parser.error("--entity re-fetches the named pages; drop --incremental")
+    if args.budget is not None and args.budget < 1:
+        parser.error("--budget must be at least 1")
+    if args.budget is not None and (args.entity or args.incremental or args.use_async or args.resume):
+        parser.error("--budget picks pages itself; it cannot be combined with --entity, --incremental, --async or --resume")
+    
+    if (args.record or args.replay or args.adaptive_pacing or args.hedge_budget) and args.use_async:
+        parser.error(
+            "--record/--replay/--adaptive-pacing/--hedge-budget work with the "
+            "requests-based engine, not --async"
+        )
+    if args.base_url:
+        set_base_url(args.base_url)
+    if args.record:
+        install_transport(RecordingAdapter(args.record))
+    elif args.replay:
+        install_transport(ReplayAdapter(args.replay))
+        set_throttle(False)
+    if args.adaptive_pacing:
+        enable_adaptive_pacing(max_rate=args.max_rate)
+    if args.hedge_budget > 0:
+        enable_hedging(HedgePolicy(args.hedge_budget, percentile=args.hedge_percentile))
+    
+    # Cassettes hold complete responses, so keep 304s out of them. Queue
+    # workers run as separate processes and would race on one cache index.
+    if not args.no_cache and not (args.record or args.replay or args.worker):
+        set_cache(HttpCache(args.cache_dir, args.cache_max_mb * 1024 * 1024))
+    # Replayed bodies were fetched when the cassette was recorded; indexing
+    # them under today's date would mislead reparse --before.
+    if not args.no_archive and not args.replay:
+        set_archive(PageArchive(args.archive_dir))
+    
+    if args.worker:
+        run_worker(JobQueue(args.queue), args.output_dir, workers=args.workers)
+    elif args.entity:
+        crawl_selected(
+            args.output_dir,
+            categories=args.only,
+            entities=args.entity,
+            workers=args.workers,
+            backend=args.backend,
+        )
+    elif args.budget is not None:
+        crawl_scheduled(
+            args.output_dir,
+            args.budget,
+            workers=args.workers,
+            runner=FETCH_BACKENDS[args.backend],
+            categories=args.only,
+        )
+    elif args.incremental:
+        crawl_incremental(
+            args.output_dir,
+            workers=args.workers,
+            runner=FETCH_BACKENDS[args.backend],
+            categories=args.only,
+        )
+    elif args.only:
+        crawl_selected(
+            args.output_dir,
+            categories=args.only,
+            workers=args.workers,
+            backend=args.backend,
+        )
+    elif args.use_async:
+        from .crawler.aio import crawl_all_async
+        crawl_all_async(args.output_dir, concurrency=args.workers)
+    else:
+        crawl_all(
+            args.output_dir,
+            workers=args.workers,
+            backend=args.backend,
+            resume=args.resume,
+        )
+    
+    cache = get_cache()
+    if cache is not None:
+        print(f"[INFO] HTTP cache: {cache.hits} not modified, {cache.misses} downloaded")
+    archive = get_archive()
+    if archive is not None:
+        print(f"[INFO] Archive: {archive.stored} new pages, {archive.duplicates} unchanged")
+    hedging = get_hedging()
+    if hedging is not None:
+        print(f"[INFO] Hedging: {hedging.hedges} hedges sent, {hedging.hedge_wins} won")
+    for host, stats in pacing_stats().items():
+        print(
+            f"[INFO] Pacing {host}: {stats['requests']} requests, "
+            f"{stats['effective_rate']:.2f} req/s effective, "
+            f"rate {stats['lowest_rate']:.2f}-{stats['highest_rate']:.2f} req/s "
+            f"(final {stats['final_rate']:.2f}), {stats['pushbacks']} pushbacks, "
+            f"{stats['slow_responses']} slow, avg latency {stats['avg_latency']:.2f}s"
+        )
+
+
+def run_bench(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.save_corpus:
+        save_corpus(args.archive_dir, args.corpus)
+        return
+    
+    categories = None
+    if args.only is not None:
+        categories = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in categories if name not in CRAWLERS]
+        if unknown:
+            parser.error(f"unknown categories: {', '.join(unknown)}")
+    corpus = args.corpus
+    if args.mock:
+        corpus = None
+    elif not corpus.is_dir() or not any(corpus.glob("*.html.gz")):
+        print(
+            f"[WARN] No saved pages in {corpus} (create them with --save-corpus after a crawl); "
+            "benchmarking generated mock wiki pages instead"
+        )
+        corpus = None
+    if args.parser is not None:
+        missing = set(args.parser) - set(available_backends())
+        if missing:
+            parser.error(f"parser backend not installed: {', '.join(sorted(missing))}")
+    
+    report = run_benchmarks(corpus, backends=args.parser, categories=categories, repeat=args.repeat)
+    write_report(report, args.output)
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+def parse_th_range(text: str) -> range:
+    first, sep, last = text.partition("-")
+    if not sep or not first.strip().isdigit() or not last.strip().isdigit():
+        raise ValueError(f"expected FIRST-LAST, got {text!r}")
+    first_th, last_th = int(first), int(last)
+    if first_th > last_th:
+        raise ValueError(f"empty range {text!r}")
+    return range(first_th, last_th + 1)
+
+
+def run_build(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    chosen = [args.town_hall is not None, args.all, args.th_range is not None]
+    if sum(chosen) != 1:
+        parser.error("build needs exactly one of: a Town Hall level, --all, --range FIRST-LAST")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    
+    if args.all:
+        town_halls = None
+    elif args.th_range is not None:
+        try:
+            town_halls = parse_th_range(args.th_range)
+        except ValueError as e:
+            parser.error(f"--range: {e}")
+    else:
+        town_halls = [args.town_hall]
+    failures = build_all_th_tables(args.raw_dir, args.output_dir, town_halls, jobs=args.jobs, engine=args.engine)
+    if failures:
+        parser.exit(1, f"[ERROR] build finished with {len(failures)} failed workbooks\n")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Clash of Clans upgrade data crawler and table builder"
@@ -49,13 +380,311 @@ def main():
         default=Path("data/raw"),
         help="Directory for raw JSON output (default: data/raw)"
     )
+    crawl_parser.add_argument(
+        "--raw-format",
+        choices=RAW_FORMATS,
+        default="json",
+        help="Raw category files as one JSON array or as JSON Lines, one row per line (default: json)"
+    )
+    crawl_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of concurrent fetch workers (default: 1, sequential)"
+    )
+    crawl_parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the asyncio engine; --workers sets the requests in flight (requires aiohttp)"
+    )
+    crawl_parser.add_argument(
+        "--backend",
+        choices=sorted(FETCH_BACKENDS),
+        default="html",
+        help=(
+            "html: one rendered page per entity; api: batched api.php calls; "
+            "wikitext: batched page source; pipeline: rendered pages parsed in a "
+            "process pool while fetching continues (default: html)"
+        )
+    )
+    crawl_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted crawl, fetching only entities missing from the progress journal"
+    )
+    crawl_parser.add_argument(
+        "--only",
+        metavar="CATEGORIES",
+        help="Comma-separated categories to crawl (e.g. heroes,defenses); rows are merged into the existing raw JSON"
+    )
+    crawl_parser.add_argument(
+        "--entity",
+        action="append",
+        metavar="NAME",
+        help="Re-fetch only this entity (repeatable), splicing its rows into the existing raw JSON"
+    )
+    crawl_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-fetch only pages whose wiki revision changed since the last crawl"
+    )
+    crawl_parser.add_argument(
+        "--budget",
+        type=int,
+        metavar="N",
+        help="Refresh only the N stalest pages, ranked by last fetch time and how recently they changed"
+    )
+    queue_group = crawl_parser.add_mutually_exclusive_group()
+    queue_group.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Add one job per entity (limited by --only/--entity) to the SQLite queue and exit"
+    )
+    queue_group.add_argument(
+        "--worker",
+        action="store_true",
+        help="Process queued jobs until the queue is empty; run several to share the work"
+    )
+    crawl_parser.add_argument(
+        "--queue",
+        type=Path,
+        default=DEFAULT_QUEUE_FILE,
+        help=f"SQLite database holding the job queue and shared rate limit (default: {DEFAULT_QUEUE_FILE})"
+    )
+    crawl_parser.add_argument(
+        "--from-dump",
+        type=Path,
+        metavar="XML",
+        help="Build raw JSON from a MediaWiki XML export (.xml, .xml.bz2, .xml.gz) without network access"
+    )
+    cassette_group = crawl_parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        type=Path,
+        metavar="DIR",
+        help="Save every HTTP response to a compressed cassette in DIR"
+    )
+    cassette_group.add_argument(
+        "--replay",
+        type=Path,
+        metavar="DIR",
+        help="Serve responses from the cassette in DIR: no network, no delays"
+    )
+    crawl_parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        help="Wiki root to fetch pages from, e.g. a local mockwiki server (default: the Fandom wiki)"
+    )
+    crawl_parser.add_argument(
+        "--adaptive-pacing",
+        action="store_true",
+        help="Adjust the request rate to server feedback (AIMD) instead of a fixed 1.5 s interval"
+    )
+    crawl_parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=4.0,
+        help="Upper bound for --adaptive-pacing in requests per second (default: 4)"
+    )
+    crawl_parser.add_argument(
+        "--hedge-budget",
+        type=int,
+        default=0,
+        help="Send up to N duplicate requests for pages slower than --hedge-percentile (default: 0, off)"
+    )
+    crawl_parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=95.0,
+        help="Latency percentile, learned during the run, that triggers a hedge (default: 95)"
+    )
+    crawl_parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the HTTP response cache (default: data/cache)"
+    )
+    crawl_parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Evict least recently used pages beyond this size (default: 256)"
+    )
+    crawl_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download full pages without the response cache"
+    )
+    crawl_parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=DEFAULT_ARCHIVE_DIR,
+        help="Keep every fetched page, compressed and deduplicated, for reparse (default: data/archive)"
+    )
+    crawl_parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="Do not archive fetched pages"
+    )
+    
+    reparse_parser = subparsers.add_parser(
+        "reparse", help="Rebuild raw JSON from archived pages without network access"
+    )
+    reparse_parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=DEFAULT_ARCHIVE_DIR,
+        help="Page archive written by crawl (default: data/archive)"
+    )
+    reparse_parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("data/raw"),
+        help="Directory for raw JSON output (default: data/raw)"
+    )
+    reparse_parser.add_argument(
+        "--raw-format",
+        choices=RAW_FORMATS,
+        default="json",
+        help="Raw category files as one JSON array or as JSON Lines (default: json)"
+    )
+    reparse_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parser processes (default: one per CPU)"
+    )
+    reparse_parser.add_argument(
+        "--before",
+        metavar="DATE",
+        help="Use the newest pages fetched on or before this ISO date (default: newest)"
+    )
+    
+    bench_parser = subparsers.add_parser(
+        "bench", help="Measure parser throughput and memory on a saved page corpus"
+    )
+    bench_parser.add_argument(
+        "--corpus",
+        type=Path,
+        default=DEFAULT_CORPUS_DIR,
+        help=f"Directory of saved pages (default: {DEFAULT_CORPUS_DIR})"
+    )
+    bench_parser.add_argument(
+        "--save-corpus",
+        action="store_true",
+        help="Fill the corpus with the newest archived page of every entity and exit"
+    )
+    bench_parser.add_argument(
+        "--mock",
+        action="store_true",
+        help="Benchmark generated mock wiki pages instead of the saved corpus"
+    )
+    bench_parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=DEFAULT_ARCHIVE_DIR,
+        help="Page archive to take the corpus from (default: data/archive)"
+    )
+    bench_parser.add_argument(
+        "--parser",
+        action="append",
+        choices=PARSER_BACKENDS,
+        help="BeautifulSoup backend to measure (repeatable; default: every installed one)"
+    )
+    bench_parser.add_argument(
+        "--only",
+        metavar="CATEGORIES",
+        help="Comma-separated categories to benchmark (default: all)"
+    )
+    bench_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed passes per category; the fastest counts (default: 3)"
+    )
+    bench_parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON results file (default: benchmarks/results/<UTC time>.json)"
+    )
+    bench_parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Earlier results file to compare against"
+    )
+    
+    mock_parser = subparsers.add_parser(
+        "mockwiki", help="Serve generated wiki pages locally for crawler load tests"
+    )
+    mock_parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    mock_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    mock_parser.add_argument(
+        "--entities",
+        type=int,
+        default=0,
+        help="Synthetic entities per category on top of the real ones (default: 0)"
+    )
+    mock_parser.add_argument("--levels", type=int, default=10, help="Table rows per page (default: 10)")
+    mock_parser.add_argument(
+        "--page-kb",
+        type=int,
+        default=0,
+        help="Pad pages with navigation markup to about this size (default: 0)"
+    )
+    mock_parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    mock_parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random seconds")
+    mock_parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with 429 Too Many Requests (default: 0)"
+    )
+    mock_parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        help="Retry-After seconds sent with each 429 (default: 1)"
+    )
+    mock_parser.add_argument(
+        "--slow-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests delayed by --slow-seconds (default: 0)"
+    )
+    mock_parser.add_argument("--slow-seconds", type=float, default=5.0, help="Delay of slow responses (default: 5)")
+    mock_parser.add_argument("--seed", type=int, default=0, help="Seed for page content and faults (default: 0)")
     
     build_parser = subparsers.add_parser("build", help="Generate Excel tables for a Town Hall")
     build_parser.add_argument(
         "town_hall",
         type=int,
+        nargs="?",
         help="Town Hall level (e.g. 11)"
     )
+    build_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Build every Town Hall level found in the raw data in one pass"
+    )
+    build_parser.add_argument(
+        "--range",
+        dest="th_range",
+        metavar="FIRST-LAST",
+        help="Build an inclusive range of Town Hall levels in one pass (e.g. 10-17)"
+    )
+    build_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Workbooks written in parallel by a process pool (default: 1)"
+    )
+    build_parser.add_argument(
+        "--engine",
+        choices=sorted(WORKBOOK_ENGINES),
+        default=DEFAULT_ENGINE,
+        help=f"Workbook writer; openpyxl streams rows without pandas (default: {DEFAULT_ENGINE})"
+    )
     build_parser.add_argument(
         "--raw-dir",
         type=Path,
@@ -71,10 +700,31 @@ def main():
     
     args = parser.parse_args()
     
+    if args.command in ("crawl", "reparse"):
+        set_raw_format(args.raw_format)
+    
     if args.command == "crawl":
-        crawl_all(args.output_dir)
+        run_crawl(parser, args)
+    elif args.command == "reparse":
+        reparse(args.archive_dir, args.output_dir, workers=args.workers, before=args.before)
+    elif args.command == "bench":
+        run_bench(parser, args)
+    elif args.command == "mockwiki":
+        config = MockWikiConfig(
+            entities=args.entities,
+            levels=args.levels,
+            page_kb=args.page_kb,
+            latency=args.latency,
+            jitter=args.jitter,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+            slow_rate=args.slow_rate,
+            slow_seconds=args.slow_seconds,
+            seed=args.seed,
+        )
+        MockWiki(config).serve_forever(args.host, args.port)
     elif args.command == "build":
-        build_th_tables(args.raw_dir, args.output_dir, args.town_hall)
+        run_build(parser, args)
     else:
         parser.print_help()
 
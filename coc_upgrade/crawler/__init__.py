@@ -12,7 +12,25 @@ from . import (
     building_max_counts,
 )
 
+# Category key -> crawler module, in crawl order.
+CRAWLERS = {
+    module.CATEGORY: module
+    for module in (
+        defenses,
+        resources,
+        army_buildings,
+        troops_elixir,
+        troops_dark,
+        spells_elixir,
+        spells_dark,
+        heroes,
+        siege_machines,
+        building_max_counts,
+    )
+}
+
 __all__ = [
+    "CRAWLERS",
     "defenses",
     "resources",
     "army_buildings",
@@ -0,0 +1,145 @@
+"""asyncio crawl engine built on aiohttp.
+
+Reuses the per-category ``parse_*`` functions through each crawler's
+``build_jobs``; only fetching differs from the threaded engine.
+"""
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence
+
+from . import CRAWLERS
+from . import base
+from .base import CrawlJob, REQUEST_INTERVAL, USER_AGENT
+
+
+class AsyncTokenBucket:
+    """Token bucket shared by every coroutine on one event loop."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def create_session(concurrency: int = 8):
+    """Keep-alive session whose connection pool matches the concurrency."""
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+async def fetch_html_async(
+    session,
+    url: str,
+    limiter: Optional[AsyncTokenBucket] = None,
+    timeout: int = 15,
+) -> str:
+    import aiohttp
+
+    cache = base.get_cache()
+    headers = cache.conditional_headers(url) if cache is not None else {}
+    if limiter is not None:
+        await limiter.acquire()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with session.get(url, timeout=client_timeout, headers=headers) as resp:
+        if resp.status == 304 and cache is not None:
+            cached = cache.load(url)
+            if cached is not None:
+                return cached
+        if resp.status != 304:
+            resp.raise_for_status()
+            body = await resp.text()
+            if cache is not None:
+                cache.store(url, body, resp.headers)
+            return body
+
+    # Cached body vanished after a 304; fetch it in full.
+    if limiter is not None:
+        await limiter.acquire()
+    async with session.get(url, timeout=client_timeout) as resp:
+        resp.raise_for_status()
+        return await resp.text()
+
+
+async def run_job_async(session, job: CrawlJob, limiter: Optional[AsyncTokenBucket] = None) -> Any:
+    url = base.BASE_URL + job.slug
+    print(f"[INFO] Fetching {job.kind}: {job.name} -> {url}")
+    html = base.archive_page(url, await fetch_html_async(session, url, limiter))
+    # BeautifulSoup work is CPU-bound; keep it off the event loop.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, job.parse, html, *job.args)
+
+
+async def run_jobs_async(
+    jobs: Sequence[CrawlJob],
+    concurrency: int = 8,
+    session=None,
+    limiter: Optional[AsyncTokenBucket] = None,
+) -> List[Any]:
+    """Async counterpart of ``base.run_jobs``: results in job order, None on failure."""
+    if limiter is None:
+        limiter = AsyncTokenBucket(rate=1 / REQUEST_INTERVAL)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(job: CrawlJob, session) -> Any:
+        async with semaphore:
+            try:
+                return await run_job_async(session, job, limiter)
+            except Exception as e:
+                print(f"[ERROR] Failed to fetch {job.name}: {e}")
+                return None
+
+    if session is not None:
+        return await asyncio.gather(*(run_one(job, session) for job in jobs))
+    async with create_session(concurrency) as own_session:
+        return await asyncio.gather(*(run_one(job, own_session) for job in jobs))
+
+
+async def crawl_async(
+    output_dir: Path,
+    categories: Optional[Iterable[str]] = None,
+    concurrency: int = 8,
+    session=None,
+    limiter: Optional[AsyncTokenBucket] = None,
+) -> None:
+    """Crawl the given categories (default: all) under one event loop."""
+    selected = list(categories) if categories is not None else list(CRAWLERS)
+    unknown = [c for c in selected if c not in CRAWLERS]
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    job_groups = [CRAWLERS[category].build_jobs() for category in selected]
+    jobs = [job for group in job_groups for job in group]
+    results = await run_jobs_async(jobs, concurrency, session=session, limiter=limiter)
+
+    offset = 0
+    for category, group in zip(selected, job_groups):
+        CRAWLERS[category].save_results(output_dir, results[offset:offset + len(group)])
+        offset += len(group)
+
+
+def crawl_all_async(output_dir: Path, concurrency: int = 8) -> None:
+    asyncio.run(crawl_async(output_dir, concurrency=concurrency))
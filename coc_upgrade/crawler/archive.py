@@ -0,0 +1,178 @@
+"""Content-addressed archive of every fetched page.
+
+Bodies are stored once per distinct content under ``objects/``, named after
+their SHA-256 and compressed with zstd (gzip when ``zstandard`` is not
+installed). ``index.jsonl`` records one line per fetch -- URL, crawl time
+and content hash -- so the page a crawl saw on any date can be looked up
+again. ``reparse`` rebuilds the raw JSON from the archive without network
+access.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from . import CRAWLERS
+from . import base
+from .base import CrawlJob
+
+
+DEFAULT_ARCHIVE_DIR = Path("data/archive")
+
+INDEX_FILE = "index.jsonl"
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), ".zst"
+    return gzip.compress(data), ".gz"
+
+
+def _decompress(data: bytes, suffix: str) -> bytes:
+    if suffix == ".gz":
+        return gzip.decompress(data)
+    if zstandard is None:
+        raise RuntimeError("zstd-compressed archive entry needs the zstandard package")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+class PageArchive:
+    def __init__(self, archive_dir: Path = DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = Path(archive_dir)
+        self._index_file = self.archive_dir / INDEX_FILE
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.duplicates = 0
+
+    def _object_stem(self, digest: str) -> Path:
+        return self.archive_dir / "objects" / digest[:2] / digest
+
+    def _find_object(self, digest: str) -> Optional[Path]:
+        stem = self._object_stem(digest)
+        for suffix in (".zst", ".gz"):
+            path = stem.with_suffix(suffix)
+            if path.exists():
+                return path
+        return None
+
+    def store(self, url: str, body: str) -> str:
+        """Archive ``body`` as fetched from ``url``; returns its content hash."""
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            if self._find_object(digest) is None:
+                compressed, suffix = _compress(data)
+                path = self._object_stem(digest).with_suffix(suffix)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = path.with_name(path.name + f".{os.getpid()}.tmp")
+                tmp_file.write_bytes(compressed)
+                os.replace(tmp_file, path)
+                self.stored += 1
+            else:
+                self.duplicates += 1
+
+            entry = {
+                "url": url,
+                "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "sha256": digest,
+            }
+            with open(self._index_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return digest
+
+    def load(self, digest: str) -> str:
+        path = self._find_object(digest)
+        if path is None:
+            raise FileNotFoundError(f"Archive object missing: {digest}")
+        return _decompress(path.read_bytes(), path.suffix).decode("utf-8")
+
+    def latest(self, before: Optional[str] = None) -> Dict[str, str]:
+        """URL -> content hash of its newest fetch, optionally not after ``before``.
+
+        ``before`` is an ISO date or timestamp compared as a string prefix, so
+        ``"2024-06-01"`` includes every fetch made on that day.
+        """
+        latest: Dict[str, Tuple[str, str]] = {}
+        if not self._index_file.exists():
+            return {}
+
+        with open(self._index_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                fetched_at = entry["fetched_at"]
+                if before is not None and fetched_at[:len(before)] > before:
+                    continue
+                current = latest.get(entry["url"])
+                if current is None or fetched_at >= current[0]:
+                    latest[entry["url"]] = (fetched_at, entry["sha256"])
+        return {url: digest for url, (_, digest) in latest.items()}
+
+
+def _reparse_one(archive_dir: Path, digest: str, job: CrawlJob) -> Any:
+    html = PageArchive(archive_dir).load(digest)
+    return job.parse(html, *job.args)
+
+
+def reparse(
+    archive_dir: Path,
+    raw_data_dir: Path,
+    workers: Optional[int] = None,
+    before: Optional[str] = None,
+    categories: Optional[Sequence[str]] = None,
+) -> None:
+    """Regenerate raw JSON from archived pages with a process pool.
+
+    Only rendered article pages (the ``html`` backend) can be reparsed;
+    entities without one in the archive are reported and left out, and
+    categories with none at all keep their current file.
+    """
+    raw_data_dir.mkdir(parents=True, exist_ok=True)
+    archive = PageArchive(archive_dir)
+    latest = archive.latest(before)
+    selected = list(categories) if categories is not None else list(CRAWLERS)
+    job_groups = {category: CRAWLERS[category].build_jobs() for category in selected}
+
+    tasks: List[Tuple[CrawlJob, str]] = []
+    for jobs in job_groups.values():
+        for job in jobs:
+            digest = latest.get(base.BASE_URL + job.slug)
+            if digest is None:
+                print(f"[WARN] {job.name}: page not in archive, skipping")
+            else:
+                tasks.append((job, digest))
+
+    print(f"[INFO] Reparsing {len(tasks)} archived pages...")
+    results: Dict[Tuple[str, str], Any] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_reparse_one, archive.archive_dir, digest, job): job
+            for job, digest in tasks
+        }
+        for future, job in futures.items():
+            try:
+                results[(job.category, job.name)] = future.result()
+            except Exception as e:
+                print(f"[ERROR] Failed to parse {job.name}: {e}")
+
+    for category, jobs in job_groups.items():
+        category_results = [results.get((job.category, job.name)) for job in jobs]
+        if all(result is None for result in category_results):
+            print(f"[WARN] Nothing reparsed for {category}, keeping existing file")
+            continue
+        CRAWLERS[category].save_results(raw_data_dir, category_results)
+    print("[OK] Completed reparse.")
@@ -1,59 +1,516 @@
+import json
+import os
 import re
+import threading
 import time
-from typing import List, Optional
+from email.utils import parsedate_to_datetime
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import BaseAdapter
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from .cache import HttpCache
+
+if TYPE_CHECKING:
+    from .archive import PageArchive
 
 
 BASE_URL = "https://clashofclans.fandom.com/wiki/"
 
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0 Safari/537.36"
+)
+
+REQUEST_INTERVAL = 1.5
+
+# Raw category files: one indented JSON array, or one JSON object per line.
+RAW_FORMATS = ("json", "jsonl")
+
+# lxml builds the tree in C; html.parser is the pure-Python fallback.
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 _session = None
 
+_cache: Optional[HttpCache] = None
+
+_archive: Optional["PageArchive"] = None
+
+_raw_format = "json"
+
+_throttle = True
+
+_adaptive_pacing: Optional[Dict[str, float]] = None
+
+# Statuses that mean "slow down" and are worth retrying under adaptive pacing.
+PUSHBACK_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_PUSHBACK_RETRIES = 3
+
+_hedging: Optional["HedgePolicy"] = None
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+_rate_limiters: Dict[str, "TokenBucket"] = {}
+_rate_limiters_lock = threading.Lock()
+
+_rate_limiter_factory: Optional[Callable[[str], "TokenBucket"]] = None
+
 
 def get_session() -> requests.Session:
     global _session
     if _session is None:
         _session = requests.Session()
-        _session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0 Safari/537.36"
-            )
-        })
+        _session.headers.update({"User-Agent": USER_AGENT})
     return _session
 
 
-def fetch_html(url: str, timeout: int = 15) -> str:
+def install_transport(adapter: BaseAdapter) -> None:
+    """Route every request of the shared session through ``adapter``."""
     session = get_session()
-    resp = session.get(url, timeout=timeout)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def set_base_url(url: str) -> None:
+    """Fetch pages from another wiki root, e.g. a local mock server."""
+    global BASE_URL
+    BASE_URL = url if url.endswith("/") else url + "/"
+
+
+def set_throttle(enabled: bool) -> None:
+    """Turn rate limiting and inter-request sleeps on or off (replay runs)."""
+    global _throttle
+    _throttle = enabled
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is free."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, status: int, latency: float, retry_after: Optional[float] = None) -> None:
+        """Feedback hook called after each response; fixed buckets ignore it."""
+
+
+class AdaptivePacer(TokenBucket):
+    """AIMD pacing: add to the rate while healthy, cut it on pushback.
+
+    429/5xx responses and responses slower than ``slow_latency`` halve the
+    rate; any other response adds ``increase`` requests/s. A Retry-After
+    header pauses every request to the host until it expires.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = 0.1,
+        max_rate: float = 4.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        slow_latency: float = 5.0,
+    ):
+        super().__init__(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self._paused_until = 0.0
+        self._started = time.monotonic()
+        self.requests = 0
+        self.pushbacks = 0
+        self.slow_responses = 0
+        self.total_latency = 0.0
+        self.lowest_rate = rate
+        self.highest_rate = rate
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+        super().acquire()
+
+    def record(self, status: int, latency: float, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            if status in PUSHBACK_STATUSES or latency > self.slow_latency:
+                if status in PUSHBACK_STATUSES:
+                    self.pushbacks += 1
+                else:
+                    self.slow_responses += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.lowest_rate = min(self.lowest_rate, self.rate)
+            self.highest_rate = max(self.highest_rate, self.rate)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "requests": self.requests,
+                "pushbacks": self.pushbacks,
+                "slow_responses": self.slow_responses,
+                "avg_latency": self.total_latency / self.requests if self.requests else 0.0,
+                "effective_rate": self.requests / elapsed if elapsed > 0 else 0.0,
+                "final_rate": self.rate,
+                "lowest_rate": self.lowest_rate,
+                "highest_rate": self.highest_rate,
+            }
+
+
+def enable_adaptive_pacing(**options: float) -> None:
+    """Pace new hosts with ``AdaptivePacer`` instead of the fixed interval.
+
+    ``options`` are passed to ``AdaptivePacer``. Fixed sleeps between
+    sequential requests are skipped since the pacer decides the spacing.
+    """
+    global _adaptive_pacing
+    _adaptive_pacing = dict(options)
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+
+
+def set_rate_limiter_factory(factory: Optional[Callable[[str], TokenBucket]]) -> None:
+    """Build each host's limiter with ``factory(host)`` (e.g. one shared across processes)."""
+    global _rate_limiter_factory
+    _rate_limiter_factory = factory
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+
+
+def get_rate_limiter(url: str) -> TokenBucket:
+    """Return the bucket shared by every request to the host of ``url``."""
+    host = urlparse(url).netloc
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            if _rate_limiter_factory is not None:
+                limiter = _rate_limiter_factory(host)
+            elif _adaptive_pacing is not None:
+                limiter = AdaptivePacer(rate=1 / REQUEST_INTERVAL, **_adaptive_pacing)
+            else:
+                limiter = TokenBucket(rate=1 / REQUEST_INTERVAL)
+            _rate_limiters[host] = limiter
+    return limiter
+
+
+def pacing_stats() -> Dict[str, Dict[str, float]]:
+    """Per-host statistics of the adaptive pacers used so far."""
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {
+        host: limiter.stats()
+        for host, limiter in limiters.items()
+        if isinstance(limiter, AdaptivePacer)
+    }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def set_cache(cache: Optional[HttpCache]) -> None:
+    """Install (or with None, remove) the response cache used by fetch_html."""
+    global _cache
+    _cache = cache
+
+
+def get_cache() -> Optional[HttpCache]:
+    return _cache
+
+
+def set_archive(archive: Optional["PageArchive"]) -> None:
+    """Install (or with None, remove) the archive that keeps every fetched page."""
+    global _archive
+    _archive = archive
+
+
+def get_archive() -> Optional["PageArchive"]:
+    return _archive
+
+
+def set_raw_format(raw_format: str) -> None:
+    """Choose the format new raw category files are written in."""
+    global _raw_format
+    if raw_format not in RAW_FORMATS:
+        raise ValueError(f"Unknown raw format: {raw_format}")
+    _raw_format = raw_format
+
+
+def get_raw_format() -> str:
+    return _raw_format
+
+
+def raw_file(output_dir: Path, category: str) -> Path:
+    """Where ``category`` is written in the current raw format."""
+    return output_dir / f"{category}.{_raw_format}"
+
+
+def find_raw_file(raw_data_dir: Path, category: str) -> Optional[Path]:
+    """The newest existing raw file of ``category`` in any format."""
+    found = [
+        path for path in (raw_data_dir / f"{category}.{fmt}" for fmt in RAW_FORMATS)
+        if path.exists()
+    ]
+    return max(found, key=lambda path: path.stat().st_mtime) if found else None
+
+
+class HedgePolicy:
+    """When to send a duplicate ("hedge") request for a slow page.
+
+    The trigger is the ``percentile`` of the response latencies seen so far
+    in this run; no hedges are sent before ``min_samples`` responses. At most
+    ``budget`` hedges are sent per run.
+    """
+
+    def __init__(self, budget: int, percentile: float = 95.0, min_samples: int = 10):
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def threshold(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.budget:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+
+def enable_hedging(policy: Optional[HedgePolicy]) -> None:
+    """Hedge slow requests in fetch_html according to ``policy`` (None: off)."""
+    global _hedging
+    _hedging = policy
+
+
+def get_hedging() -> Optional[HedgePolicy]:
+    return _hedging
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _hedge_pool
+
+
+def _discard(future: Future) -> None:
+    """Cancel a losing request, or close its response once it arrives."""
+    if future.cancel():
+        return
+
+    def close(done: Future) -> None:
+        if not done.cancelled() and done.exception() is None:
+            done.result().close()
+
+    future.add_done_callback(close)
+
+
+def _hedged_get(
+    session: requests.Session,
+    url: str,
+    timeout: int,
+    headers: Optional[Dict[str, str]],
+) -> requests.Response:
+    pool = _get_hedge_pool()
+    started = time.monotonic()
+    primary = pool.submit(session.get, url, timeout=timeout, headers=headers)
+    primary.add_done_callback(lambda _: _hedging.observe(time.monotonic() - started))
+
+    threshold = _hedging.threshold()
+    if threshold is None:
+        return primary.result()
+    try:
+        return primary.result(timeout=threshold)
+    except FutureTimeoutError:
+        pass
+    if not _hedging.try_spend():
+        return primary.result()
+
+    print(f"[INFO] Hedging request slower than {threshold:.2f}s: {url}")
+
+    def send_hedge() -> requests.Response:
+        if _throttle:
+            get_rate_limiter(url).acquire()
+        return session.get(url, timeout=timeout, headers=headers)
+
+    hedge = pool.submit(send_hedge)
+    pending = {primary, hedge}
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    _discard(loser)
+                if future is hedge:
+                    _hedging.record_win()
+                return future.result()
+            first_error = first_error or future.exception()
+    raise first_error
+
+
+def _paced_get(url: str, timeout: int, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    session = get_session()
+    limiter = get_rate_limiter(url)
+    retries = MAX_PUSHBACK_RETRIES if isinstance(limiter, AdaptivePacer) else 0
+
+    while True:
+        if _throttle:
+            limiter.acquire()
+        started = time.monotonic()
+        if _hedging is not None:
+            resp = _hedged_get(session, url, timeout, headers)
+        else:
+            resp = session.get(url, timeout=timeout, headers=headers)
+        limiter.record(
+            resp.status_code,
+            time.monotonic() - started,
+            parse_retry_after(resp.headers.get("Retry-After")),
+        )
+        if resp.status_code not in PUSHBACK_STATUSES or retries <= 0:
+            return resp
+        retries -= 1
+        print(f"[WARN] HTTP {resp.status_code} from {url}, backing off and retrying")
+
+
+def fetch_html(url: str, timeout: int = 15) -> str:
+    headers = _cache.conditional_headers(url) if _cache is not None else {}
+    resp = _paced_get(url, timeout, headers)
+    if resp.status_code == 304 and _cache is not None:
+        cached = _cache.load(url)
+        if cached is not None:
+            return cached
+        # Entry vanished between the request and now; fetch it in full.
+        resp = _paced_get(url, timeout)
     resp.raise_for_status()
+    if _cache is not None:
+        _cache.store(url, resp.text, resp.headers)
     return resp.text
 
 
-def parse_time_to_str(time_text: str) -> str:
-    """Normalize wiki time strings to the 'Xd Yh Zm' format."""
+def archive_page(url: str, html: str) -> str:
+    """Keep an article page in the installed archive; returns ``html``.
+
+    Called by the job runners rather than ``fetch_html``, so api.php
+    queries are never archived: ``reparse`` only reads article pages.
+    """
+    if _archive is not None:
+        _archive.store(url, html)
+    return html
+
+
+_DAYS_RE = re.compile(r"(\d+)\s*d")
+_HOURS_RE = re.compile(r"(\d+)\s*h")
+_MINUTES_RE = re.compile(r"(\d+)\s*m")
+
+
+@lru_cache(maxsize=4096)
+def _time_parts(time_text: str) -> Tuple[int, int, int]:
+    """``(days, hours, minutes)`` of a wiki time string; cached, as a crawl
+    sees the same few hundred strings over and over."""
     text = time_text.strip().lower()
     if not text or text in {"-", "—"}:
-        return ""
+        return 0, 0, 0
     if "instant" in text:
-        return ""
-
-    days = hours = minutes = 0
+        return 0, 0, 0
 
-    m = re.search(r"(\d+)\s*d", text) or re.search(r"(\d+)\s*day", text)
-    if m:
-        days = int(m.group(1))
+    parts = []
+    for pattern in (_DAYS_RE, _HOURS_RE, _MINUTES_RE):
+        m = pattern.search(text)
+        parts.append(int(m.group(1)) if m else 0)
+    return parts[0], parts[1], parts[2]
 
-    m = re.search(r"(\d+)\s*h", text) or re.search(r"(\d+)\s*hour", text)
-    if m:
-        hours = int(m.group(1))
-
-    m = re.search(r"(\d+)\s*m", text) or re.search(r"(\d+)\s*min", text)
-    if m:
-        minutes = int(m.group(1))
 
+def _format_parts(days: int, hours: int, minutes: int) -> str:
     parts: List[str] = []
     if days:
         parts.append(f"{days}d")
@@ -61,10 +518,30 @@ def parse_time_to_str(time_text: str) -> str:
         parts.append(f"{hours}h")
     if minutes:
         parts.append(f"{minutes}m")
-
     return " ".join(parts)
 
 
+def parse_time_to_seconds(time_text: str) -> int:
+    """Wiki time string as whole seconds (0 for instant or missing)."""
+    days, hours, minutes = _time_parts(time_text)
+    return days * 86400 + hours * 3600 + minutes * 60
+
+
+def format_duration(seconds: int) -> str:
+    """Seconds in the 'Xd Yh Zm' format, e.g. for summed upgrade times.
+
+    Unlike ``parse_time_to_str`` a zero total reads '0m', not ''.
+    """
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    return _format_parts(days, hours, rest // 60) or "0m"
+
+
+def parse_time_to_str(time_text: str) -> str:
+    """Normalize wiki time strings to the 'Xd Yh Zm' format."""
+    return _format_parts(*_time_parts(time_text))
+
+
 def clean_int(text: str) -> int:
     """Extract digits and convert to int."""
     if not text:
@@ -76,6 +553,31 @@ def clean_int(text: str) -> int:
     return int(digits) if digits else 0
 
 
+def parse_tables(html: str, table_class: str = "wikitable") -> BeautifulSoup:
+    """Parse only the ``table.<table_class>`` subtrees of a page.
+
+    Skin, navigation and article text are never turned into tags, which is
+    where most of the parse time and memory of a full Fandom page goes.
+    """
+    strainer = SoupStrainer("table", class_=table_class)
+    return BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
+
+
+@contextmanager
+def page_tables(html: str, table_class: str = "wikitable") -> Iterator[BeautifulSoup]:
+    """``parse_tables`` whose tree is torn down when the block exits.
+
+    A soup is a web of parent/child reference cycles that only the cyclic
+    garbage collector would reclaim; decomposing it frees the page as soon
+    as its rows have been extracted.
+    """
+    soup = parse_tables(html, table_class)
+    try:
+        yield soup
+    finally:
+        soup.decompose()
+
+
 def find_table_by_headers(
     soup: BeautifulSoup,
     required_headers: List[str],
@@ -107,5 +609,486 @@ def find_column_index(headers: List[str], *keywords: str) -> int:
     return -1
 
 
-def sleep_between_requests(seconds: float = 1.5):
-    time.sleep(seconds)
+@dataclass(frozen=True)
+class Column:
+    """A column role and the header keyword sets that identify it, tried in order."""
+    role: str
+    keywords: Tuple[Tuple[str, ...], ...]
+    required: bool = True
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """Which wikitable a crawler reads and which columns it needs from it.
+
+    ``required_headers`` lists alternatives for ``find_table_by_headers``;
+    the first one that matches a table wins. ``label`` names the table in
+    warnings.
+    """
+    label: str
+    required_headers: Tuple[Tuple[str, ...], ...]
+    columns: Tuple[Column, ...]
+
+
+@dataclass
+class GridTable:
+    headers: List[str]
+    columns: Dict[str, int]
+    rows: List[Dict[str, Tag]]
+
+    def header(self, role: str) -> str:
+        return self.headers[self.columns[role]] if role in self.columns else ""
+
+
+def _span(cell: Tag, attr: str) -> int:
+    try:
+        return min(max(int(cell.get(attr, 1)), 1), 1000)
+    except (TypeError, ValueError):
+        return 1
+
+
+def table_grid(table: Tag) -> List[List[Optional[Tag]]]:
+    """Lay a table out as a dense grid in one pass.
+
+    A cell with rowspan/colspan fills every slot it covers, so each row has
+    a cell under every header even when the wiki merged them. Slots nothing
+    covers (short rows) are None.
+    """
+    grid: List[List[Optional[Tag]]] = []
+    # Column -> [cell, rows it still covers] for rowspans from rows above.
+    carried: Dict[int, list] = {}
+
+    for tr in table.find_all("tr"):
+        row: List[Optional[Tag]] = []
+
+        def take_carried() -> None:
+            while len(row) in carried:
+                col = len(row)
+                cell, remaining = carried[col]
+                row.append(cell)
+                if remaining <= 1:
+                    del carried[col]
+                else:
+                    carried[col][1] = remaining - 1
+
+        for cell in tr.find_all(["th", "td"], recursive=False):
+            take_carried()
+            rowspan = _span(cell, "rowspan")
+            for _ in range(_span(cell, "colspan")):
+                if rowspan > 1:
+                    carried[len(row)] = [cell, rowspan - 1]
+                row.append(cell)
+        take_carried()
+
+        # Rowspans reaching past the end of a short row.
+        for col in sorted(c for c in carried if c > len(row)):
+            row.extend([None] * (col - len(row)))
+            take_carried()
+        grid.append(row)
+
+    return grid
+
+
+@lru_cache(maxsize=256)
+def _resolve_columns(
+    headers: Tuple[str, ...],
+    columns: Tuple[Column, ...],
+) -> Tuple[Tuple[str, int], ...]:
+    resolved = []
+    for column in columns:
+        for keywords in column.keywords:
+            idx = find_column_index(list(headers), *keywords)
+            if idx >= 0:
+                resolved.append((column.role, idx))
+                break
+    return tuple(resolved)
+
+
+def resolve_columns(headers: Sequence[str], columns: Sequence[Column]) -> Dict[str, int]:
+    """Role -> column index; memoized per header signature since pages share layouts."""
+    return dict(_resolve_columns(tuple(headers), tuple(columns)))
+
+
+def extract_table(soup: BeautifulSoup, spec: TableSpec, name: str) -> Optional[GridTable]:
+    """Find the table described by ``spec`` and return its rows keyed by role.
+
+    Rows lacking a cell for a resolved column, and full-width rows where one
+    cell spans several of them (notes, totals), are left out.
+    """
+    table = None
+    for required in spec.required_headers:
+        table = find_table_by_headers(soup, list(required))
+        if table is not None:
+            break
+    if table is None:
+        print(f"[WARN] {spec.label} for {name} not found, skipping")
+        return None
+
+    grid = table_grid(table)
+    headers = [c.get_text(" ", strip=True) if c is not None else "" for c in grid[0]]
+    columns = resolve_columns(headers, spec.columns)
+    missing = [c.role for c in spec.columns if c.required and c.role not in columns]
+    if missing:
+        print(f"[WARN] Table headers for {name} are incomplete ({', '.join(missing)}): {headers}. Skipping")
+        return None
+
+    rows = []
+    for grid_row in grid[1:]:
+        if len(grid_row) <= max(columns.values()):
+            continue
+        cells = {role: grid_row[idx] for role, idx in columns.items()}
+        if any(cell is None for cell in cells.values()):
+            continue
+        if len({id(cell) for cell in cells.values()}) < len(cells):
+            continue
+        rows.append(cells)
+
+    return GridTable(headers, columns, rows)
+
+
+def cost_fields(currency: str, cost: int) -> Dict[str, int]:
+    """Spread a cost over the gold/elixir/dark_elixir record fields."""
+    return {
+        "gold": cost if currency == "gold" else 0,
+        "elixir": cost if currency == "elixir" else 0,
+        "dark_elixir": cost if currency == "de" else 0,
+    }
+
+
+# Builder upgrades: defenses, resources, army buildings.
+BUILDING_TABLE = TableSpec(
+    label="Upgrade table",
+    required_headers=(("level", "cost", "time", "town hall"),),
+    columns=(
+        Column("level", (("level",),)),
+        Column("cost", (("build", "cost"), ("upgrade", "cost"), ("cost",))),
+        Column("time", (("build", "time"), ("upgrade", "time"))),
+        Column("th", (("town", "hall"),)),
+    ),
+)
+
+# Laboratory research: troops and spells.
+RESEARCH_TABLE = TableSpec(
+    label="Research table",
+    required_headers=(("level", "research cost", "research time", "laboratory"),),
+    columns=(
+        Column("level", (("level",),)),
+        Column("cost", (("research", "cost"),)),
+        Column("time", (("research", "time"),)),
+        Column("lab", (("laboratory", "level"),)),
+    ),
+)
+
+
+def building_rows(html: str, name: str, currency: str) -> List[Dict[str, Any]]:
+    """Records of a page with a ``BUILDING_TABLE``, costs paid in ``currency``."""
+    with page_tables(html) as soup:
+        table = extract_table(soup, BUILDING_TABLE, name)
+        if table is None:
+            return []
+        
+        rows_data = []
+        
+        for cells in table.rows:
+            level_nums = re.findall(r"\d+", cells["level"].get_text(strip=True))
+            if not level_nums:
+                continue
+            
+            th_nums = re.findall(r"\d+", cells["th"].get_text(strip=True))
+            cost_val = clean_int(cells["cost"].get_text(" ", strip=True))
+            
+            rows_data.append({
+                "name": name,
+                "level": int(level_nums[0]),
+                **cost_fields(currency, cost_val),
+                "builder_time_raw": cells["time"].get_text(strip=True),
+                "lab_time_raw": "",
+                "town_hall_required": int(th_nums[0]) if th_nums else None,
+                "lab_level_required": None,
+                "hero_hall_level_required": None,
+            })
+    
+    return rows_data
+
+
+def research_rows(
+    html: str,
+    name: str,
+    currency: Union[str, Callable[[Tag], str]],
+) -> List[Dict[str, Any]]:
+    """Records of a page with a ``RESEARCH_TABLE``.
+
+    ``currency`` is either fixed or a function of the cost cell, for pages
+    that mix Elixir and Dark Elixir.
+    """
+    with page_tables(html) as soup:
+        table = extract_table(soup, RESEARCH_TABLE, name)
+        if table is None:
+            return []
+        
+        rows = []
+        
+        for cells in table.rows:
+            raw_level = cells["level"].get_text(strip=True)
+            if not raw_level or raw_level.lower() == "level":
+                continue
+            
+            cost_cell = cells["cost"]
+            row_currency = currency(cost_cell) if callable(currency) else currency
+            
+            rows.append({
+                "name": name,
+                "level": clean_int(raw_level),
+                **cost_fields(row_currency, clean_int(cost_cell.get_text(strip=True))),
+                "builder_time_raw": "",
+                "lab_time_raw": cells["time"].get_text(" ", strip=True),
+                "town_hall_required": None,
+                "lab_level_required": clean_int(cells["lab"].get_text(strip=True)),
+                "hero_hall_level_required": None,
+            })
+    
+    return rows
+
+
+def sleep_between_requests(seconds: float = REQUEST_INTERVAL):
+    if _throttle and _adaptive_pacing is None:
+        time.sleep(seconds)
+
+
+@dataclass(frozen=True)
+class CrawlJob:
+    """One wiki page to fetch and the parser that turns it into records."""
+    category: str
+    kind: str
+    name: str
+    slug: str
+    parse: Callable[..., Any]
+    args: tuple = ()
+
+
+def run_job(job: CrawlJob) -> Any:
+    url = BASE_URL + job.slug
+    print(f"[INFO] Fetching {job.kind}: {job.name} -> {url}")
+    html = archive_page(url, fetch_html(url))
+    return job.parse(html, *job.args)
+
+
+def run_jobs(
+    jobs: Sequence[CrawlJob],
+    workers: int = 1,
+    on_result: Optional[Callable[[CrawlJob, Any], None]] = None,
+) -> List[Any]:
+    """Run jobs and return their results in job order (None on failure).
+
+    With ``workers > 1`` pages are fetched from a thread pool; the per-host
+    rate limiter in ``fetch_html`` keeps the request rate unchanged.
+    ``on_result`` is called with each successful job as soon as it finishes.
+    """
+    results: List[Any] = [None] * len(jobs)
+
+    if workers <= 1:
+        for i, job in enumerate(jobs):
+            try:
+                results[i] = run_job(job)
+                if on_result is not None:
+                    on_result(job, results[i])
+                sleep_between_requests()
+            except Exception as e:
+                print(f"[ERROR] Failed to fetch {job.name}: {e}")
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+                if on_result is not None:
+                    on_result(jobs[i], results[i])
+            except Exception as e:
+                print(f"[ERROR] Failed to fetch {jobs[i].name}: {e}")
+    return results
+
+
+def write_json_atomic(output_file: Path, data: Any) -> None:
+    """Write JSON through a temp file so readers never see a partial file."""
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+
+
+def _encode_row(row: Dict[str, Any], jsonl: bool) -> str:
+    if jsonl:
+        return json.dumps(row, ensure_ascii=False) + "\n"
+    # Same layout as json.dump(rows, indent=2), one array item at a time.
+    text = json.dumps(row, ensure_ascii=False, indent=2)
+    return "  " + text.replace("\n", "\n  ")
+
+
+class RecordStream:
+    """Writes a category file row by row while its entities are being parsed.
+
+    Rows go out in ``jobs`` order: an entity that finishes early waits in
+    memory only until every entity before it has been written. Entities
+    never added (failed fetches) are skipped when the stream is closed. The
+    format follows the file suffix, and the file is swapped in atomically
+    by ``close``.
+    """
+
+    def __init__(self, output_file: Path, jobs: Sequence[CrawlJob]):
+        self.output_file = output_file
+        self.jobs = list(jobs)
+        self.count = 0
+        self._jsonl = output_file.suffix == ".jsonl"
+        self._order = {job.name: i for i, job in enumerate(jobs)}
+        self._held: Dict[int, List[Dict[str, Any]]] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._tmp_file = output_file.with_name(output_file.name + ".tmp")
+        self._file = open(self._tmp_file, "w", encoding="utf-8")
+        if not self._jsonl:
+            self._file.write("[")
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if not self._jsonl:
+                self._file.write(",\n" if self.count else "\n")
+            self._file.write(_encode_row(row, self._jsonl))
+            self.count += 1
+
+    def extend(self, rows: List[Dict[str, Any]]) -> None:
+        """Write rows right away, outside the job order."""
+        with self._lock:
+            self._write(rows)
+
+    def add(self, job: CrawlJob, rows: Optional[List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._held[self._order[job.name]] = rows or []
+            while self._next in self._held:
+                self._write(self._held.pop(self._next))
+                self._next += 1
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            for index in sorted(self._held):
+                self._write(self._held.pop(index))
+            if not self._jsonl:
+                self._file.write("\n]" if self.count else "]")
+            self._file.close()
+            os.replace(self._tmp_file, self.output_file)
+        print(f"[OK] Saved to: {self.output_file}, total records: {self.count}")
+
+    def abort(self) -> None:
+        with self._lock:
+            self._file.close()
+            self._tmp_file.unlink(missing_ok=True)
+
+    def __enter__(self) -> "RecordStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_records(input_file: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a raw category file; JSON Lines files are read lazily."""
+    with open(input_file, "r", encoding="utf-8") as f:
+        if input_file.suffix != ".jsonl":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def save_records(output_file: Path, results: Iterable[Optional[List[Dict[str, Any]]]]) -> None:
+    with RecordStream(output_file, []) as stream:
+        for rows in results:
+            if rows:
+                stream.extend(rows)
+
+
+def write_records_atomic(output_file: Path, rows: Iterable[Dict[str, Any]]) -> None:
+    """Write rows in the format given by the file suffix, atomically."""
+    if output_file.suffix != ".jsonl":
+        write_json_atomic(output_file, list(rows))
+        return
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(_encode_row(row, True))
+    os.replace(tmp_file, output_file)
+
+
+def merge_records(
+    output_file: Path,
+    all_jobs: Sequence[CrawlJob],
+    jobs: Sequence[CrawlJob],
+    results: Sequence[Optional[List[Dict[str, Any]]]],
+) -> None:
+    """Splice re-fetched entities into an existing category file.
+
+    Rows of every entity in ``jobs`` whose fetch succeeded are replaced;
+    all other rows are kept. Output follows the order of ``all_jobs`` so a
+    merged file matches what a full crawl would write.
+    """
+    existing: Iterable[Dict[str, Any]] = []
+    source = find_raw_file(output_file.parent, output_file.name.rsplit(".", 1)[0])
+    if source is not None:
+        # Rows of the other format are carried over when switching formats.
+        existing = read_records(source)
+
+    fresh = {job.name: rows for job, rows in zip(jobs, results) if rows is not None}
+
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for row in existing:
+        by_name.setdefault(row["name"], []).append(row)
+    by_name.update(fresh)
+
+    merged: List[Dict[str, Any]] = []
+    for job in all_jobs:
+        merged.extend(by_name.pop(job.name, []))
+    for rows in by_name.values():
+        merged.extend(rows)
+
+    write_records_atomic(output_file, merged)
+    if source is not None and source != output_file:
+        source.unlink()
+
+    print(f"[OK] Updated {len(fresh)} entities in: {output_file}, total records: {len(merged)}")
+
+
+class RowCategory:
+    """Output side of a crawler whose jobs each yield a list of rows.
+
+    A crawler module declares its table, parser and ``build_jobs`` and
+    exports the bound methods of one instance as its ``save_results``,
+    ``merge_results``, ``open_stream`` and ``crawl``.
+    """
+
+    def __init__(self, category: str, build_jobs: Callable[[], List[CrawlJob]]):
+        self.category = category
+        self.build_jobs = build_jobs
+
+    def save_results(self, output_dir: Path, results: List[Optional[List[Dict[str, Any]]]]) -> None:
+        save_records(raw_file(output_dir, self.category), results)
+
+    def merge_results(
+        self,
+        output_dir: Path,
+        jobs: List[CrawlJob],
+        results: List[Optional[List[Dict[str, Any]]]],
+    ) -> None:
+        merge_records(raw_file(output_dir, self.category), self.build_jobs(), jobs, results)
+
+    def open_stream(self, output_dir: Path) -> RecordStream:
+        return RecordStream(raw_file(output_dir, self.category), self.build_jobs())
+
+    def crawl(self, output_dir: Path, workers: int = 1) -> None:
+        with self.open_stream(output_dir) as stream:
+            run_jobs(stream.jobs, workers=workers, on_result=stream.add)
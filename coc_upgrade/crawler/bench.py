@@ -0,0 +1,201 @@
+"""Parser throughput benchmark over a saved page corpus.
+
+The corpus is a directory of gzip-compressed pages named after their wiki
+slug, one per crawler job (``bench --save-corpus`` copies the newest
+version of every page from the page archive). Every category parser runs
+over its pages with each available BeautifulSoup backend, without network
+access, and the numbers are written as JSON so runs before and after a
+parser change can be compared.
+
+Without a saved corpus, pages are generated in memory by the mock wiki.
+They have the real table layouts but none of the real markup, so such
+reports are tagged ``"synthetic": true``.
+"""
+import contextlib
+import gzip
+import io
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from . import CRAWLERS
+from . import base
+from .archive import PageArchive
+from .base import CrawlJob
+from .mockwiki import MockWiki, MockWikiConfig
+
+
+DEFAULT_CORPUS_DIR = Path("benchmarks/corpus")
+
+DEFAULT_RESULTS_DIR = Path("benchmarks/results")
+
+# Mock pages used when there is no saved corpus; roughly the size and
+# row count of a rendered article page.
+MOCK_CORPUS_CONFIG = MockWikiConfig(levels=12, page_kb=150)
+
+PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def corpus_file(corpus_dir: Path, slug: str) -> Path:
+    return corpus_dir / f"{quote(slug, safe='')}.html.gz"
+
+
+def save_corpus(archive_dir: Path, corpus_dir: Path) -> None:
+    """Copy the newest archived page of every crawler job into the corpus."""
+    archive = PageArchive(archive_dir)
+    latest = archive.latest()
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    saved = 0
+    for crawler in CRAWLERS.values():
+        for job in crawler.build_jobs():
+            digest = latest.get(base.BASE_URL + job.slug)
+            if digest is None:
+                print(f"[WARN] {job.name}: page not in archive, skipping")
+                continue
+            # mtime=0 keeps the files byte-identical between runs.
+            data = gzip.compress(archive.load(digest).encode("utf-8"), mtime=0)
+            corpus_file(corpus_dir, job.slug).write_bytes(data)
+            saved += 1
+    print(f"[OK] Saved {saved} pages to: {corpus_dir}")
+
+
+def mock_pages(wiki: MockWiki, jobs: Sequence[CrawlJob]) -> List[Tuple[CrawlJob, str]]:
+    return [(job, wiki.page(job.slug)) for job in jobs]
+
+
+def load_corpus(corpus_dir: Path, jobs: Sequence[CrawlJob]) -> List[Tuple[CrawlJob, str]]:
+    pages = []
+    for job in jobs:
+        page_file = corpus_file(corpus_dir, job.slug)
+        if page_file.exists():
+            pages.append((job, gzip.decompress(page_file.read_bytes()).decode("utf-8")))
+    return pages
+
+
+def _row_count(result: Any) -> int:
+    return len(result) if result else 0
+
+
+def _parse_all(pages: Sequence[Tuple[CrawlJob, str]]) -> int:
+    rows = 0
+    # Parser warnings would only measure the terminal.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for job, html in pages:
+            rows += _row_count(job.parse(html, *job.args))
+    return rows
+
+
+def bench_category(pages: Sequence[Tuple[CrawlJob, str]], repeat: int = 3) -> Dict[str, Any]:
+    """Best-of-``repeat`` throughput and the peak traced memory of one pass."""
+    seconds = float("inf")
+    rows = 0
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        rows = _parse_all(pages)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Traced separately: tracemalloc slows allocation-heavy code a lot.
+    tracemalloc.start()
+    try:
+        _parse_all(pages)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "pages": len(pages),
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "pages_per_sec": round(len(pages) / seconds, 2) if seconds else None,
+        "rows_per_sec": round(rows / seconds, 2) if seconds else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def available_backends() -> List[str]:
+    backends = []
+    for backend in PARSER_BACKENDS:
+        if backend == "lxml":
+            try:
+                import lxml  # noqa: F401
+            except ImportError:
+                print("[WARN] lxml is not installed, skipping that backend")
+                continue
+        backends.append(backend)
+    return backends
+
+
+def run_benchmarks(
+    corpus_dir: Optional[Path],
+    backends: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """Benchmark ``corpus_dir``, or mock wiki pages when it is None."""
+    selected = list(categories) if categories is not None else list(CRAWLERS)
+    backends = list(backends) if backends is not None else available_backends()
+    wiki = MockWiki(MOCK_CORPUS_CONFIG) if corpus_dir is None else None
+
+    results: List[Dict[str, Any]] = []
+    original_parser = base.HTML_PARSER
+    try:
+        for category in selected:
+            jobs = CRAWLERS[category].build_jobs()
+            pages = mock_pages(wiki, jobs) if wiki is not None else load_corpus(corpus_dir, jobs)
+            if not pages:
+                print(f"[WARN] No corpus pages for {category}, skipping")
+                continue
+            if len(pages) < len(jobs):
+                print(f"[WARN] {category}: {len(jobs) - len(pages)} pages missing from the corpus")
+            for backend in backends:
+                base.HTML_PARSER = backend
+                result = {"category": category, "parser": backend, **bench_category(pages, repeat)}
+                print(
+                    f"[INFO] {category:<20} {backend:<12} {result['pages_per_sec']:>9} pages/s "
+                    f"{result['rows_per_sec']:>10} rows/s  peak {result['peak_kb']} KB"
+                )
+                results.append(result)
+    finally:
+        base.HTML_PARSER = original_parser
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": str(corpus_dir) if corpus_dir is not None else "mock wiki",
+        "synthetic": corpus_dir is None,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the throughput change of every category/parser pair found in both."""
+    if report.get("synthetic", False) != baseline.get("synthetic", False):
+        print("[WARN] Comparing a mock wiki run with a saved-page run; the numbers are not comparable")
+    before = {(r["category"], r["parser"]): r for r in baseline["results"]}
+    for result in report["results"]:
+        old = before.get((result["category"], result["parser"]))
+        if old is None or not old["pages_per_sec"] or not result["pages_per_sec"]:
+            continue
+        speedup = result["pages_per_sec"] / old["pages_per_sec"]
+        memory = result["peak_kb"] / old["peak_kb"] if old["peak_kb"] else float("nan")
+        print(
+            f"[INFO] {result['category']:<20} {result['parser']:<12} "
+            f"{speedup:.2f}x throughput, {memory:.2f}x peak memory"
+        )
+
+
+def write_report(report: Dict[str, Any], output_file: Optional[Path] = None) -> Path:
+    if output_file is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_file = DEFAULT_RESULTS_DIR / f"{stamp}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    base.write_json_atomic(output_file, report)
+    print(f"[OK] Benchmark results saved to: {output_file}")
+    return output_file
@@ -1,12 +1,16 @@
 import json
 import re
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
-from .base import fetch_html, BASE_URL
+from .base import run_jobs, write_json_atomic, CrawlJob, BASE_URL, page_tables, table_grid
 
 
-URL = "https://clashofclans.fandom.com/wiki/Town_Hall"
+CATEGORY = "building_max_counts"
+
+SLUG = "Town_Hall"
+
+URL = BASE_URL + SLUG
 
 
 def extract_number(text: str) -> int:
@@ -17,18 +21,18 @@ def extract_number(text: str) -> int:
 def parse_max_count_table(table) -> Dict[tuple, int]:
     result = {}
     
-    header_row = table.find("tr")
-    head_cells = header_row.find_all(["th", "td"])
-    headers = [c.get_text(" ", strip=True) for c in head_cells]
+    grid = table_grid(table)
+    if not grid:
+        return {}
+    headers = [c.get_text(" ", strip=True) if c is not None else "" for c in grid[0]]
     
     if len(headers) < 2:
         return {}
     
     building_names = headers[1:]
     
-    for tr in table.find_all("tr")[1:]:
-        cells = tr.find_all(["th", "td"])
-        if len(cells) < len(building_names) + 1:
+    for cells in grid[1:]:
+        if len(cells) < len(building_names) + 1 or None in cells:
             continue
         
         th_text = cells[0].get_text(strip=True)
@@ -48,47 +52,66 @@ def parse_max_count_table(table) -> Dict[tuple, int]:
     return result
 
 
-def crawl(output_dir: Path) -> None:
-    print("[INFO] Fetching max building counts...")
-    
-    html = fetch_html(URL)
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
-    
-    tables = soup.find_all("table", class_="wikitable")
-    
-    keyword_list = [
-        "maximum number of buildings",
-        "maximum number of army buildings",
-        "maximum number of resource buildings",
-        "maximum number",
-    ]
-    
-    total_map = {}
-    
-    for tbl in tables:
-        caption = tbl.find("caption")
-        caption_text = caption.get_text(strip=True).lower() if caption else ""
+def parse_max_counts(html: str) -> Dict[str, int]:
+    """Parse the Town Hall page into ``{"TH|Building Name": count}``."""
+    with page_tables(html) as soup:
+        tables = soup.find_all("table", class_="wikitable")
         
-        if any(keyword in caption_text for keyword in keyword_list):
-            tbl_name = caption_text
-            part = parse_max_count_table(tbl)
-            total_map.update(part)
-            print(f"[INFO] Parsed table: {tbl_name} ({len(part)} entries)")
-    
-    output_file = output_dir / "building_max_counts.json"
-    
-    output_dict = {
+        keyword_list = [
+            "maximum number of buildings",
+            "maximum number of army buildings",
+            "maximum number of resource buildings",
+            "maximum number",
+        ]
+        
+        total_map = {}
+        
+        for tbl in tables:
+            caption = tbl.find("caption")
+            caption_text = caption.get_text(strip=True).lower() if caption else ""
+            
+            if any(keyword in caption_text for keyword in keyword_list):
+                tbl_name = caption_text
+                part = parse_max_count_table(tbl)
+                total_map.update(part)
+                print(f"[INFO] Parsed table: {tbl_name} ({len(part)} entries)")
+    
+    return {
         f"{th}|{bname}": count
         for (th, bname), count in total_map.items()
     }
+
+
+def build_jobs() -> List[CrawlJob]:
+    return [CrawlJob(CATEGORY, "max building counts", "Town Hall", SLUG, parse_max_counts)]
+
+
+def save_results(output_dir: Path, results: List[Optional[Dict[str, int]]]) -> None:
+    output_dict = results[0] if results else None
+    if output_dict is None:
+        print("[WARN] Max building counts unavailable, keeping existing file")
+        return
     
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_dict, f, ensure_ascii=False, indent=2)
+    output_file = output_dir / f"{CATEGORY}.json"
+    write_json_atomic(output_file, output_dict)
     
     print(f"[OK] Saved to: {output_file}, total mappings: {len(output_dict)}")
 
 
+def merge_results(
+    output_dir: Path,
+    jobs: List[CrawlJob],
+    results: List[Optional[Dict[str, int]]],
+) -> None:
+    # The whole table comes from one page, so merging is a plain rewrite.
+    if any(result is not None for result in results):
+        save_results(output_dir, results)
+
+
+def crawl(output_dir: Path, workers: int = 1) -> None:
+    save_results(output_dir, run_jobs(build_jobs(), workers=workers))
+
+
 def load_max_counts(max_counts_file: Path) -> Dict[tuple, int]:
     if not max_counts_file.exists():
         return {}
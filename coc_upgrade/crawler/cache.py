@@ -0,0 +1,119 @@
+"""Persistent HTTP response cache with ETag/Last-Modified revalidation."""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+
+DEFAULT_CACHE_DIR = Path("data/cache")
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class HttpCache:
+    """URL-keyed body store; least recently used entries are evicted first.
+
+    ``index.json`` holds the validators and bookkeeping for every entry and
+    each body lives in its own file named after the URL hash.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._index_file = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self._index_file.exists():
+            try:
+                with open(self._index_file, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Unreadable cache index {self._index_file} ({e}), starting empty")
+                self._index = {}
+            if self._evict():
+                self._save_index()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_file(self, url: str) -> Path:
+        return self.cache_dir / f"{self._key(url)}.html"
+
+    def _save_index(self) -> None:
+        tmp_file = self._index_file.with_suffix(f".json.{os.getpid()}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_file, self._index_file)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Validators to send so the server can answer 304 Not Modified."""
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is None or not self._body_file(url).exists():
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, url: str) -> Optional[str]:
+        """Return the cached body and mark it as recently used."""
+        body_file = self._body_file(url)
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None or not body_file.exists():
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self._save_index()
+        return body_file.read_text(encoding="utf-8")
+
+    def store(self, url: str, body: str, headers: Mapping[str, str]) -> None:
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            # Nothing to revalidate with, so the entry could never be reused.
+            with self._lock:
+                self.misses += 1
+            return
+
+        data = body.encode("utf-8")
+        body_file = self._body_file(url)
+        with self._lock:
+            self.misses += 1
+            tmp_file = body_file.with_suffix(".html.tmp")
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, body_file)
+            self._index[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(data),
+                "last_used": time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> bool:
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return False
+
+        by_age = sorted(self._index.items(), key=lambda item: item[1]["last_used"])
+        for url, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            self._body_file(url).unlink(missing_ok=True)
+            del self._index[url]
+            total -= entry["size"]
+        return True
@@ -0,0 +1,65 @@
+"""Append-only progress journal for resumable crawls.
+
+Every entity that finished fetching and parsing is appended to
+``crawl_journal.jsonl`` in the raw data directory as one JSON line holding
+its rows. An interrupted crawl can then be resumed: entities found in the
+journal are taken from it and only the rest are fetched again.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from .base import CrawlJob
+
+
+JOURNAL_FILE = "crawl_journal.jsonl"
+
+
+def job_key(job: CrawlJob) -> Tuple[str, str]:
+    return job.category, job.name
+
+
+class CrawlJournal:
+    def __init__(self, raw_data_dir: Path):
+        self.path = Path(raw_data_dir) / JOURNAL_FILE
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[Tuple[str, str], Any]:
+        """Results of every finished entity; a torn last line is ignored."""
+        done: Dict[Tuple[str, str], Any] = {}
+        if not self.path.exists():
+            return done
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[(entry["category"], entry["name"])] = entry["result"]
+        return done
+
+    def reset(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            open(self.path, "w", encoding="utf-8").close()
+
+    def append(self, job: CrawlJob, result: Any) -> None:
+        entry = {
+            "category": job.category,
+            "name": job.name,
+            "slug": job.slug,
+            "result": result,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def remove(self) -> None:
+        with self._lock:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,133 @@
+"""Offline crawl from a MediaWiki XML export (``Special:Export`` or a dump).
+
+The export is streamed with ``iterparse`` and every finished ``<page>`` is
+discarded right away, so memory stays flat regardless of dump size. Only the
+pages named in the crawler tables are kept; their source goes through the
+wikitext table conversion and the same ``parse_*`` functions as a live crawl.
+"""
+import bz2
+import gzip
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from . import CRAWLERS
+from .api import slug_to_title
+from .wikitext import wikitext_to_html
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _open_dump(path: Path):
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_dump_pages(path: Path) -> Iterator[Tuple[str, Optional[str], str]]:
+    """Yield ``(title, redirect_target, text)`` for every page in the export.
+
+    With several revisions per page the last one wins.
+    """
+    with _open_dump(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+
+        for event, elem in context:
+            if event != "end" or _local(elem.tag) != "page":
+                continue
+
+            title = ""
+            redirect = None
+            text = ""
+            for child in elem:
+                name = _local(child.tag)
+                if name == "title":
+                    title = child.text or ""
+                elif name == "redirect":
+                    redirect = child.get("title")
+                elif name == "revision":
+                    for field in child:
+                        if _local(field.tag) == "text":
+                            text = field.text or ""
+
+            yield title, redirect, text
+            # Drop the finished page so the tree never grows.
+            root.clear()
+
+
+def load_pages(path: Path, titles: Set[str]) -> Dict[str, str]:
+    """Return title -> source for ``titles``, following redirects.
+
+    A redirect target that appears before its redirect in the dump is picked
+    up by a second pass, which only happens when such redirects exist.
+    """
+    pages: Dict[str, str] = {}
+    redirects: Dict[str, str] = {}
+
+    wanted = set(titles)
+    for title, redirect, text in iter_dump_pages(path):
+        if title not in wanted:
+            continue
+        if redirect:
+            redirects[title] = redirect
+            wanted.add(redirect)
+        else:
+            pages[title] = text
+
+    missing_targets = {target for target in redirects.values() if target not in pages}
+    if missing_targets:
+        for title, redirect, text in iter_dump_pages(path):
+            if title in missing_targets and not redirect:
+                pages[title] = text
+
+    for title, target in redirects.items():
+        seen = set()
+        while target in redirects and target not in seen:
+            seen.add(target)
+            target = redirects[target]
+        if target in pages:
+            pages[title] = pages[target]
+
+    return {title: pages[title] for title in titles if title in pages}
+
+
+def crawl_from_dump(
+    dump_path: Path,
+    raw_data_dir: Path,
+    categories: Optional[Sequence[str]] = None,
+) -> None:
+    raw_data_dir.mkdir(parents=True, exist_ok=True)
+    selected = list(categories) if categories is not None else list(CRAWLERS)
+
+    job_groups = {category: CRAWLERS[category].build_jobs() for category in selected}
+    titles = {slug_to_title(job.slug) for jobs in job_groups.values() for job in jobs}
+
+    print(f"[INFO] Reading {len(titles)} pages from dump: {dump_path}")
+    pages = load_pages(dump_path, titles)
+    print(f"[INFO] Found {len(pages)} of {len(titles)} pages in the dump")
+
+    for category, jobs in job_groups.items():
+        results = []
+        for job in jobs:
+            source = pages.get(slug_to_title(job.slug))
+            if source is None:
+                print(f"[WARN] {job.name}: page not in dump, skipping")
+                results.append(None)
+                continue
+            tables_html = wikitext_to_html(source)
+            if "<table" not in tables_html:
+                print(f"[WARN] {job.name}: no table markup in page source, skipping")
+                results.append(None)
+                continue
+            try:
+                results.append(job.parse(tables_html, *job.args))
+            except Exception as e:
+                print(f"[ERROR] Failed to parse {job.name}: {e}")
+                results.append(None)
+        # Entities missing from the dump keep their existing rows.
+        CRAWLERS[category].merge_results(raw_data_dir, jobs, results)
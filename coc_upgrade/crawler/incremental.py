@@ -0,0 +1,107 @@
+"""Revision-aware incremental crawl.
+
+One batched ``prop=info`` query returns the latest revision ID of every
+crawler page. Only pages whose revision differs from the previous run are
+fetched again, and their rows are merged into the existing raw JSON.
+"""
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlencode
+
+from . import CRAWLERS
+from .api import QUERY_BATCH_SIZE, api_url, resolve_titles, slug_to_title
+from .base import CrawlJob, fetch_html, find_raw_file, run_jobs
+
+
+REVISIONS_FILE = "revisions.json"
+
+
+def fetch_revisions(slugs: Sequence[str]) -> Dict[str, int]:
+    """Return slug -> latest revision ID; missing pages are left out."""
+    revisions: Dict[str, int] = {}
+
+    for start in range(0, len(slugs), QUERY_BATCH_SIZE):
+        batch = slugs[start:start + QUERY_BATCH_SIZE]
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "prop": "info",
+            "redirects": "1",
+            "titles": "|".join(slug_to_title(slug) for slug in batch),
+        }
+        data = json.loads(fetch_html(api_url() + "?" + urlencode(params)))
+        query = data.get("query", {})
+
+        lastrevid = {
+            page["title"]: page["lastrevid"]
+            for page in query.get("pages", [])
+            if "lastrevid" in page
+        }
+
+        for slug, title in resolve_titles(query, batch).items():
+            if title in lastrevid:
+                revisions[slug] = lastrevid[title]
+
+    return revisions
+
+
+def load_revisions(raw_data_dir: Path) -> Dict[str, int]:
+    revisions_file = raw_data_dir / REVISIONS_FILE
+    if not revisions_file.exists():
+        return {}
+    with open(revisions_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_revisions(raw_data_dir: Path, revisions: Dict[str, int]) -> None:
+    with open(raw_data_dir / REVISIONS_FILE, "w", encoding="utf-8") as f:
+        json.dump(revisions, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def crawl_incremental(
+    raw_data_dir: Path,
+    workers: int = 1,
+    runner: Callable[..., List[Any]] = run_jobs,
+    categories: Optional[Sequence[str]] = None,
+) -> None:
+    raw_data_dir.mkdir(parents=True, exist_ok=True)
+    selected = list(categories) if categories is not None else list(CRAWLERS)
+
+    job_groups = {category: CRAWLERS[category].build_jobs() for category in selected}
+    all_jobs = [job for jobs in job_groups.values() for job in jobs]
+    slugs = sorted({job.slug for job in all_jobs})
+
+    print(f"[INFO] Checking revisions of {len(slugs)} pages...")
+    current = fetch_revisions(slugs)
+    previous = load_revisions(raw_data_dir)
+
+    changed: List[CrawlJob] = []
+    for category, jobs in job_groups.items():
+        category_missing = find_raw_file(raw_data_dir, category) is None
+        for job in jobs:
+            if category_missing or job.slug not in current or current[job.slug] != previous.get(job.slug):
+                changed.append(job)
+
+    print(f"[INFO] {len(changed)} of {len(all_jobs)} pages changed since the last crawl")
+    results = runner(changed, workers=workers) if changed else []
+
+    # Only remember revisions of pages that were parsed successfully, so a
+    # failed page is retried on the next run.
+    failed = {job.slug for job, result in zip(changed, results) if result is None}
+    revisions = dict(previous)
+    for slug, revid in current.items():
+        if slug not in failed:
+            revisions[slug] = revid
+
+    for category in selected:
+        category_jobs = [job for job in changed if job.category == category]
+        if not category_jobs:
+            continue
+        category_results = [
+            result for job, result in zip(changed, results) if job.category == category
+        ]
+        CRAWLERS[category].merge_results(raw_data_dir, category_jobs, category_results)
+
+    save_revisions(raw_data_dir, revisions)
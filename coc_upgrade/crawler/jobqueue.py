@@ -0,0 +1,322 @@
+"""SQLite-backed job queue for crawls spread over several processes.
+
+``crawl --enqueue`` inserts one row per entity page. Any number of
+``crawl --worker`` processes, on one machine or on several sharing the
+database file, lease rows, fetch and parse the page and store the parsed
+rows back in the database. Leases expire, so jobs held by a worker that died
+are picked up again. The rate limit lives in the same database as a token
+bucket per host, which bounds the combined request rate of all workers.
+
+Workers keep polling while other workers hold leases, and the last one to
+find the queue drained merges every finished job into the raw JSON files.
+
+Uses SQLite's default rollback journal rather than WAL, because WAL needs
+shared memory and does not work on network file systems.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import CRAWLERS
+from . import base
+from .base import CrawlJob, TokenBucket, run_job
+
+
+DEFAULT_QUEUE_FILE = Path("data/crawl_queue.db")
+
+LEASE_SECONDS = 120
+
+MAX_ATTEMPTS = 3
+
+LEASE_POLL_SECONDS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    collected INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (category, name)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class JobQueue:
+    def __init__(self, path: Path = DEFAULT_QUEUE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps threads independent.
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, jobs: Sequence[CrawlJob]) -> None:
+        """Add jobs as pending; a job already in the queue is reset."""
+        with self._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO jobs (category, name, slug) VALUES (?, ?, ?)
+                ON CONFLICT (category, name) DO UPDATE SET
+                    slug = excluded.slug, status = 'pending', attempts = 0,
+                    worker = NULL, lease_until = NULL, result = NULL,
+                    error = NULL, collected = 0
+                """,
+                [(job.category, job.name, job.slug) for job in jobs],
+            )
+
+    def lease(self, worker: str) -> Optional[Tuple[int, str, str]]:
+        """Claim the next pending (or abandoned) job as ``(id, category, name)``."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', error = 'lease expired too often'
+                WHERE status = 'leased' AND lease_until < ? AND attempts >= ?
+                """,
+                (now, MAX_ATTEMPTS),
+            )
+            row = conn.execute(
+                """
+                SELECT id, category, name FROM jobs
+                WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?,
+                    attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker, now + LEASE_SECONDS, row[0]),
+            )
+        return row
+
+    def complete(self, job_id: int, worker: str, result: Any) -> bool:
+        """Store the result of a job ``worker`` still holds.
+
+        Returns False, and stores nothing, when the lease expired and the
+        job has moved on to another worker.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = 'done', result = ?, lease_until = NULL
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (json.dumps(result, ensure_ascii=False), job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, retry: bool = True) -> bool:
+        """Put a failed job back in line, or give up after ``MAX_ATTEMPTS``.
+
+        Like ``complete``, does nothing once ``worker`` has lost the lease.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET error = ?, lease_until = NULL,
+                    status = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (error, retry, MAX_ATTEMPTS, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def next_lease_expiry(self) -> Optional[float]:
+        """When the earliest outstanding lease runs out; None if nothing is leased."""
+        with self._connect() as conn:
+            return conn.execute("SELECT MIN(lease_until) FROM jobs WHERE status = 'leased'").fetchone()[0]
+
+    def collect(self, raw_data_dir: Path) -> None:
+        """Merge finished jobs into raw JSON once nothing is pending or leased.
+
+        The merge runs inside the transaction that marks the rows collected,
+        so with several workers finishing together only one of them writes
+        the files, and if the merge fails or the process dies the rows stay
+        uncollected for the next worker to merge.
+        """
+        try:
+            with self._transaction() as conn:
+                active = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')"
+                ).fetchone()[0]
+                if active:
+                    print(f"[INFO] {active} jobs still pending or leased; leaving the merge to the last worker")
+                    return
+                rows = conn.execute(
+                    "SELECT category, name, result FROM jobs WHERE status = 'done' AND collected = 0"
+                ).fetchall()
+                failed = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'failed' AND collected = 0"
+                ).fetchone()[0]
+                if failed:
+                    print(f"[WARN] {failed} jobs failed for good; their existing rows were kept")
+                if rows:
+                    self._merge(raw_data_dir, rows)
+                conn.execute("UPDATE jobs SET collected = 1 WHERE status IN ('done', 'failed')")
+        except sqlite3.OperationalError as e:
+            # Another worker held the lock for the whole timeout, i.e. is merging.
+            print(f"[WARN] Could not lock the queue to merge ({e}); leaving the merge to another worker")
+
+    @staticmethod
+    def _merge(raw_data_dir: Path, rows: Sequence[Tuple[str, str, str]]) -> None:
+        raw_data_dir.mkdir(parents=True, exist_ok=True)
+        finished: Dict[str, Dict[str, Any]] = {}
+        for category, name, result in rows:
+            finished.setdefault(category, {})[name] = json.loads(result)
+
+        for category, results in finished.items():
+            if category not in CRAWLERS:
+                print(f"[WARN] Unknown category in queue: {category}, skipping")
+                continue
+            jobs = [job for job in CRAWLERS[category].build_jobs() if job.name in results]
+            CRAWLERS[category].merge_results(
+                raw_data_dir, jobs, [results[job.name] for job in jobs]
+            )
+
+
+class SqliteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in the queue database.
+
+    Every process that uses the same database and host draws from one
+    bucket. Wall-clock time is used since monotonic clocks are per machine.
+    """
+
+    def __init__(self, queue: JobQueue, host: str, rate: float, capacity: float = 1.0):
+        super().__init__(rate, capacity)
+        self.queue = queue
+        self.host = host
+
+    def acquire(self) -> None:
+        while True:
+            now = time.time()
+            with self.queue._transaction() as conn:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_limits WHERE host = ?", (self.host,)
+                ).fetchone()
+                tokens, updated = row if row is not None else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                granted = tokens >= 1
+                if granted:
+                    tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (host, tokens, updated) VALUES (?, ?, ?)",
+                    (self.host, tokens, now),
+                )
+            if granted:
+                return
+            time.sleep((1 - tokens) / self.rate)
+
+
+def run_worker(
+    queue: JobQueue,
+    raw_data_dir: Path,
+    workers: int = 1,
+    rate: Optional[float] = None,
+) -> None:
+    """Process queued jobs until none are left, then try to merge the results.
+
+    ``workers`` threads lease jobs in this process. ``rate`` (requests per
+    second, default one per ``REQUEST_INTERVAL``) is shared by every worker
+    process using the queue.
+    """
+    rate = rate if rate is not None else 1 / base.REQUEST_INTERVAL
+    base.set_rate_limiter_factory(lambda host: SqliteTokenBucket(queue, host, rate))
+
+    jobs: Dict[Tuple[str, str], CrawlJob] = {
+        (category, job.name): job
+        for category, crawler in CRAWLERS.items()
+        for job in crawler.build_jobs()
+    }
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed: List[int] = []
+
+    def work(lease_id: str) -> None:
+        while True:
+            leased = queue.lease(lease_id)
+            if leased is None:
+                # Jobs leased elsewhere may still come back if their worker
+                # died, so wait until they finish or their lease runs out.
+                expiry = queue.next_lease_expiry()
+                if expiry is None:
+                    return
+                time.sleep(min(max(expiry - time.time(), 0) + 0.1, LEASE_POLL_SECONDS))
+                continue
+            job_id, category, name = leased
+            job = jobs.get((category, name))
+            if job is None:
+                print(f"[WARN] {category}/{name} is not in the crawler tables, dropping it")
+                queue.fail(job_id, lease_id, "unknown entity", retry=False)
+                continue
+            try:
+                result = run_job(job)
+            except Exception as e:
+                print(f"[ERROR] Failed to fetch {name}: {e}")
+                queue.fail(job_id, lease_id, str(e))
+                continue
+            if not queue.complete(job_id, lease_id, result):
+                print(f"[WARN] Lease on {category}/{name} expired, dropping this result")
+                continue
+            processed.append(job_id)
+
+    print(f"[INFO] Worker {worker_id} started: {queue.counts()}")
+    # Each thread leases under its own id, so an expired lease re-taken by
+    # a sibling thread is not mistaken for its own.
+    threads = [
+        threading.Thread(target=work, args=(f"{worker_id}/{i}",))
+        for i in range(max(1, workers))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"[INFO] Worker {worker_id} finished {len(processed)} jobs: {queue.counts()}")
+
+    queue.collect(raw_data_dir)
@@ -0,0 +1,288 @@
+"""Local stand-in for the wiki, for load tests of the crawler.
+
+``MockWiki`` serves generated pages at ``/wiki/<slug>`` with the same
+``wikitable`` layouts the parsers expect: one page for every real crawler
+job plus ``entities`` synthetic pages per category (``synthetic_jobs``), each
+with ``levels`` rows and padded with skin and navigation markup to about
+``page_kb`` kilobytes. Latency, HTTP 429s and slow responses can be
+injected. Pages are generated from the slug and a seed, so every run serves
+the same content, and ETags make conditional requests work.
+
+Point the crawler at it with ``crawl --base-url``.
+"""
+import hashlib
+import random
+import resource
+import threading
+import time
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from . import CRAWLERS
+from . import base
+from .base import CrawlJob
+
+
+SYNTHETIC_PREFIX = "Mock_"
+
+# Category -> table layout of its pages.
+LAYOUTS = {
+    "defenses": "building",
+    "resources": "building",
+    "army_buildings": "building",
+    "troops_elixir": "research",
+    "troops_dark": "research",
+    "spells_elixir": "research",
+    "spells_dark": "research",
+    "heroes": "hero",
+    "siege_machines": "research",
+    "building_max_counts": "town_hall",
+}
+
+HEADERS = {
+    "building": ("Level", "Build Cost", "Build Time", "Town Hall Level Required"),
+    "research": ("Level", "Research Cost", "Research Time", "Laboratory Level Required"),
+    "hero": ("Level", "Upgrade Cost", "Upgrade Time", "Hero Hall Level Required"),
+}
+
+MAX_TOWN_HALL = 17
+
+
+@dataclass(frozen=True)
+class MockWikiConfig:
+    entities: int = 0
+    levels: int = 10
+    page_kb: int = 0
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    slow_rate: float = 0.0
+    slow_seconds: float = 5.0
+    seed: int = 0
+
+
+def synthetic_jobs(entities: int) -> List[CrawlJob]:
+    """``entities`` extra jobs per row category, parsed by the real parsers."""
+    jobs = []
+    for category, crawler in CRAWLERS.items():
+        if LAYOUTS[category] == "town_hall":
+            continue
+        template = crawler.build_jobs()[0]
+        for i in range(1, entities + 1):
+            name = f"Mock {category} {i}"
+            jobs.append(replace(
+                template,
+                name=name,
+                slug=f"{SYNTHETIC_PREFIX}{category}_{i}",
+                args=(name,) + template.args[1:],
+            ))
+    return jobs
+
+
+def _time_text(rng: random.Random, level: int) -> str:
+    hours = level * rng.randint(2, 12)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h" if days else f"{hours}h {rng.choice([0, 30])}m"
+
+
+class MockWiki:
+    def __init__(self, config: MockWikiConfig = MockWikiConfig()):
+        self.config = config
+        self._entities: Dict[str, Tuple[str, str]] = {}
+        for category, crawler in CRAWLERS.items():
+            for job in crawler.build_jobs():
+                self._entities[job.slug] = (category, job.name)
+        # Max counts cover the real buildings only.
+        self._buildings = [
+            name for category, name in self._entities.values()
+            if LAYOUTS[category] == "building"
+        ]
+        for job in synthetic_jobs(config.entities):
+            self._entities[job.slug] = (job.category, job.name)
+        self._filler = self._make_filler(config.page_kb * 1024)
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "not_modified": 0, "throttled": 0, "slow": 0, "not_found": 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @staticmethod
+    def _make_filler(size: int) -> str:
+        # Skin, navigation and article text that the table strainer skips.
+        chunks = []
+        total = 0
+        i = 0
+        while total < size:
+            chunk = (
+                f'<div class="wds-dropdown"><a class="wds-tabs__tab" href="/wiki/Page_{i}">'
+                f"Navigation link {i}</a><ul><li><a href=\"/wiki/Sub_{i}\">Sub page {i}</a></li>"
+                f"</ul></div><p>Article paragraph {i} with <b>bold</b> and <i>italic</i> text.</p>\n"
+            )
+            chunks.append(chunk)
+            total += len(chunk)
+            i += 1
+        return "".join(chunks)
+
+    def page(self, slug: str) -> Optional[str]:
+        entity = self._entities.get(slug)
+        if entity is None:
+            return None
+        category, name = entity
+        layout = LAYOUTS[category]
+        rng = random.Random(f"{self.config.seed}:{slug}")
+
+        if layout == "town_hall":
+            table = self._town_hall_table(rng)
+        else:
+            table = self._upgrade_table(layout, category, rng)
+        infobox = f'<table class="infobox"><tr><th>{name}</th></tr><tr><td>Mock page</td></tr></table>'
+        half = len(self._filler) // 2
+        return (
+            f"<!DOCTYPE html><html><head><title>{name} | Clash of Clans Wiki</title></head><body>"
+            f"<nav>{self._filler[:half]}</nav><main><h1>{name}</h1>{infobox}{table}</main>"
+            f"<footer>{self._filler[half:]}</footer></body></html>"
+        )
+
+    def _upgrade_table(self, layout: str, category: str, rng: random.Random) -> str:
+        dark = category.endswith("_dark")
+        cells = ["<tr>" + "".join(f"<th>{h}</th>" for h in HEADERS[layout]) + "</tr>"]
+        for level in range(1, self.config.levels + 1):
+            cost = level * rng.randint(50, 500) * (10 if dark else 1000)
+            icon = '<img alt="Dark Elixir" src="DE.png">' if dark else '<img alt="Elixir">'
+            cells.append(
+                f"<tr><td>{level}</td><td>{cost:,}{icon}</td><td>{_time_text(rng, level)}</td>"
+                f"<td>{min(level + 2, MAX_TOWN_HALL)}</td></tr>"
+            )
+        return f'<table class="wikitable"><tbody>{"".join(cells)}</tbody></table>'
+
+    def _town_hall_table(self, rng: random.Random) -> str:
+        cells = ["<tr><th>Town Hall Level</th>" + "".join(f"<th>{b}</th>" for b in self._buildings) + "</tr>"]
+        for th in range(1, MAX_TOWN_HALL + 1):
+            counts = "".join(f"<td>{rng.randint(0, 1 + th // 3)}</td>" for _ in self._buildings)
+            cells.append(f"<tr><td>{th}</td>{counts}</tr>")
+        return (
+            '<table class="wikitable"><caption>Maximum number of buildings</caption>'
+            f'<tbody>{"".join(cells)}</tbody></table>'
+        )
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _roll(self) -> Tuple[float, float, float]:
+        with self._rng_lock:
+            return self._rng.random(), self._rng.random(), self._rng.random()
+
+    def _handler(self):
+        wiki = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                config = wiki.config
+                wiki._count("requests")
+                jitter, throttle_roll, slow_roll = wiki._roll()
+                delay = config.latency + jitter * config.jitter
+                if delay:
+                    time.sleep(delay)
+
+                if throttle_roll < config.throttle_rate:
+                    wiki._count("throttled")
+                    self._reply(429, b"", {"Retry-After": str(config.retry_after)})
+                    return
+                if slow_roll < config.slow_rate:
+                    wiki._count("slow")
+                    time.sleep(config.slow_seconds)
+
+                path = self.path.split("?", 1)[0]
+                body = wiki.page(unquote(path[len("/wiki/"):])) if path.startswith("/wiki/") else None
+                if body is None:
+                    wiki._count("not_found")
+                    self._reply(404, b"Not found", {})
+                    return
+                data = body.encode("utf-8")
+                etag = '"' + hashlib.md5(data).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    wiki._count("not_modified")
+                    self._reply(304, b"", {"ETag": etag})
+                    return
+                wiki._count("ok")
+                self._reply(200, data, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+
+            def _reply(self, status: int, data: bytes, headers: Dict[str, str]) -> None:
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if data:
+                    self.wfile.write(data)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        return Handler
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a background thread; returns the base URL for ``--base-url``."""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/wiki/"
+
+    def serve_forever(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        print(f"[INFO] Mock wiki with {len(self._entities)} pages at http://{host}:{port}/wiki/")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            print(f"[INFO] Mock wiki stats: {self.stats}")
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def load_test(
+    config: MockWikiConfig,
+    runner: Callable[..., List[Any]],
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Crawl every real and synthetic page of an in-process ``MockWiki``.
+
+    Parsed rows are discarded. Returns throughput, failures, the process's
+    peak RSS and the server's counters. ``base.BASE_URL`` is restored
+    afterwards.
+    """
+    wiki = MockWiki(config)
+    jobs = [job for crawler in CRAWLERS.values() for job in crawler.build_jobs()]
+    jobs += synthetic_jobs(config.entities)
+
+    original_url = base.BASE_URL
+    base.set_base_url(wiki.start())
+    try:
+        started = time.perf_counter()
+        results = runner(jobs, workers=workers)
+        elapsed = time.perf_counter() - started
+    finally:
+        base.set_base_url(original_url)
+        wiki.stop()
+
+    return {
+        "pages": len(jobs),
+        "failed": sum(1 for result in results if result is None),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(jobs) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "server": dict(wiki.stats),
+    }
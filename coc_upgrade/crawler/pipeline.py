@@ -0,0 +1,113 @@
+"""Two-stage crawl: fetch threads feed a process pool that parses.
+
+I/O threads download pages into a bounded queue; a dispatcher hands each
+page to a process pool, so BeautifulSoup work runs on every core instead of
+contending for the GIL with the fetchers. When parsing falls behind, the
+queue fills up and the fetchers wait, which keeps memory bounded.
+
+``CrawlJob.parse`` functions are module-level and their arguments plain
+values, so jobs pickle as they are.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from . import base
+from .base import CrawlJob
+
+
+DEFAULT_QUEUE_SIZE = 16
+
+_DONE = object()
+
+
+def _parse(job: CrawlJob, html: str) -> Any:
+    return job.parse(html, *job.args)
+
+
+def _process_context():
+    # Fetch threads are running when parsers start; forking them could copy
+    # a held lock into the child, so prefer a clean forkserver child.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def run_jobs_pipelined(
+    jobs: Sequence[CrawlJob],
+    workers: int = 1,
+    on_result: Optional[Callable[[CrawlJob, Any], None]] = None,
+    parse_workers: Optional[int] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> List[Any]:
+    """Drop-in replacement for ``base.run_jobs`` with parsing in a process pool.
+
+    ``workers`` threads fetch; ``parse_workers`` processes parse (default:
+    one per CPU). At most ``queue_size`` pages wait for or sit in the
+    parser at any time. ``on_result`` is called from the dispatcher side as
+    soon as each page is parsed.
+    """
+    results: List[Any] = [None] * len(jobs)
+    pages: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    in_flight = threading.BoundedSemaphore(queue_size)
+    callback_lock = threading.Lock()
+    stop = threading.Event()
+
+    def fetch(i: int) -> None:
+        if stop.is_set():
+            return
+        job = jobs[i]
+        url = base.BASE_URL + job.slug
+        print(f"[INFO] Fetching {job.kind}: {job.name} -> {url}")
+        try:
+            html = base.archive_page(url, base.fetch_html(url))
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch {job.name}: {e}")
+            return
+        pages.put((i, html))
+
+    def parsed(i: int, future: Future) -> None:
+        in_flight.release()
+        try:
+            results[i] = future.result()
+        except Exception as e:
+            print(f"[ERROR] Failed to parse {jobs[i].name}: {e}")
+            return
+        if on_result is not None:
+            with callback_lock:
+                on_result(jobs[i], results[i])
+
+    def fetch_all() -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as fetchers:
+                list(fetchers.map(fetch, range(len(jobs))))
+        finally:
+            pages.put(_DONE)
+
+    producer = threading.Thread(target=fetch_all, daemon=True)
+    with ProcessPoolExecutor(
+        max_workers=parse_workers or os.cpu_count(),
+        mp_context=_process_context(),
+    ) as parsers:
+        producer.start()
+        item = None
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                i, html = item
+                in_flight.acquire()
+                future = parsers.submit(_parse, jobs[i], html)
+                future.add_done_callback(lambda f, i=i: parsed(i, f))
+        finally:
+            # If the pool broke, fetchers may be blocked on a full queue.
+            stop.set()
+            while item is not _DONE:
+                item = pages.get()
+    producer.join()
+
+    return results
@@ -0,0 +1,93 @@
+"""Record/replay transports for the shared ``requests`` session.
+
+A cassette is a directory holding one gzip-compressed JSON file per
+request, named after the hash of the method and URL. Recording wraps the
+normal HTTP adapter; replay answers from the cassette and never touches the
+network.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class Cassette:
+    def __init__(self, cassette_dir: Path):
+        self.cassette_dir = Path(cassette_dir)
+
+    def _entry_file(self, method: str, url: str) -> Path:
+        key = hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+        return self.cassette_dir / f"{key}.json.gz"
+
+    def save(self, method: str, url: str, response: requests.Response) -> None:
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        entry_file = self._entry_file(method, url)
+        tmp_file = entry_file.with_suffix(".tmp")
+        with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_file, entry_file)
+
+    def load(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        entry_file = self._entry_file(method, url)
+        if not entry_file.exists():
+            return None
+        with gzip.open(entry_file, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Regular HTTP adapter that also writes every response to a cassette."""
+
+    def __init__(self, cassette_dir: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = Cassette(cassette_dir)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.cassette.save(request.method, request.url, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serve responses from a cassette; unknown requests fail fast."""
+
+    def __init__(self, cassette_dir: Path):
+        super().__init__()
+        self.cassette = Cassette(cassette_dir)
+
+    def send(self, request, **kwargs):
+        entry = self.cassette.load(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(
+                f"No recorded response for {request.method} {request.url}",
+                request=request,
+            )
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = base64.b64decode(entry["body"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
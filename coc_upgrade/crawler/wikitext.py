@@ -0,0 +1,277 @@
+"""Wikitext fetch backend.
+
+Page source is fetched in batches of up to 50 titles with
+``prop=revisions``, and only the ``{| ... |}`` tables are converted into a
+bare ``<table>`` document. The category ``parse_*`` functions then see the
+same table structure as on the rendered page, at a fraction of the size.
+Each converted cell keeps its original markup in a ``data-wikitext``
+attribute so currency detection on the cell markup (icon file names such as
+``Dark Elixir.png``) keeps working.
+
+Pages whose tables come from templates or transclusion have no usable
+table syntax in their source; when the parser finds no rows in the
+converted tables, the page falls back to the rendered HTML fetch.
+"""
+import html
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from .api import QUERY_BATCH_SIZE, api_url, resolve_titles, slug_to_title
+from .base import CrawlJob, fetch_html, run_jobs, sleep_between_requests
+
+
+_INNER_TEMPLATE_RE = re.compile(r"\{\{([^{}]*)\}\}")
+_FILE_LINK_RE = re.compile(r"\[\[(?:File|Image):[^\[\]]*\]\]", re.IGNORECASE)
+_LINK_RE = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]")
+_REF_RE = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.IGNORECASE | re.DOTALL)
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_ATTR_RE = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"']+))""")
+
+_KEPT_ATTRS = ("class", "rowspan", "colspan")
+
+
+def _template_text(match: "re.Match") -> str:
+    """Keep the positional arguments of a template, drop its name."""
+    parts = match.group(1).split("|")
+    name, args = parts[0], parts[1:]
+    kept = [arg for arg in args if "=" not in arg]
+    if ":" in name:
+        # Parser functions such as {{formatnum:1000}}.
+        kept.insert(0, name.split(":", 1)[1])
+    return " " + " ".join(kept) + " "
+
+
+def strip_markup(text: str) -> str:
+    """Reduce a cell's wikitext to the text a reader would see."""
+    text = _COMMENT_RE.sub("", text)
+    text = _REF_RE.sub("", text)
+    text = _FILE_LINK_RE.sub(" ", text)
+    previous = None
+    while previous != text:
+        previous = text
+        text = _INNER_TEMPLATE_RE.sub(_template_text, text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _BR_RE.sub(" ", text)
+    text = _TAG_RE.sub("", text)
+    text = text.replace("'''", "").replace("''", "")
+    text = html.unescape(text)
+    return " ".join(text.split())
+
+
+def _split_outside_links(text: str, sep: str) -> List[str]:
+    """Split on ``sep`` except inside ``[[...]]`` and ``{{...}}``."""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in ("[[", "{{"):
+            depth += 1
+            i += 2
+            continue
+        if pair in ("]]", "}}"):
+            depth = max(0, depth - 1)
+            i += 2
+            continue
+        if depth == 0 and text.startswith(sep, i):
+            parts.append(text[start:i])
+            i += len(sep)
+            start = i
+            continue
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_attrs(text: str) -> Dict[str, str]:
+    attrs = {}
+    for m in _ATTR_RE.finditer(text):
+        value = next(v for v in m.groups()[1:] if v is not None)
+        attrs[m.group(1).lower()] = value
+    return attrs
+
+
+def _split_cell(cell: str) -> Tuple[Dict[str, str], str]:
+    """Separate ``attrs | content``; a bare content cell has no attributes."""
+    parts = _split_outside_links(cell, "|")
+    if len(parts) > 1 and "=" in parts[0]:
+        return _parse_attrs(parts[0]), "|".join(parts[1:])
+    return {}, cell
+
+
+def _render_attrs(attrs: Dict[str, str]) -> str:
+    return "".join(
+        f' {name}="{html.escape(attrs[name])}"' for name in _KEPT_ATTRS if name in attrs
+    )
+
+
+class _Table:
+    def __init__(self, attrs: Dict[str, str]):
+        self.attrs = attrs
+        self.caption = ""
+        self.rows: List[List[Tuple[str, Dict[str, str], str]]] = []
+
+    def add_cells(self, tag: str, line: str, sep: str) -> None:
+        if not self.rows:
+            self.rows.append([])
+        for cell in _split_outside_links(line, sep):
+            attrs, content = _split_cell(cell)
+            self.rows[-1].append((tag, attrs, content))
+
+    def append_text(self, line: str) -> None:
+        if self.rows and self.rows[-1]:
+            tag, attrs, content = self.rows[-1][-1]
+            self.rows[-1][-1] = (tag, attrs, content + "\n" + line)
+        elif self.caption:
+            self.caption += " " + line
+
+    def to_html(self) -> str:
+        out = [f"<table{_render_attrs(self.attrs)}>"]
+        if self.caption:
+            out.append(f"<caption>{html.escape(strip_markup(self.caption))}</caption>")
+        for row in self.rows:
+            if not row:
+                continue
+            out.append("<tr>")
+            for tag, attrs, content in row:
+                out.append(
+                    f'<{tag}{_render_attrs(attrs)} data-wikitext="{html.escape(content)}">'
+                    f"{html.escape(strip_markup(content))}</{tag}>"
+                )
+            out.append("</tr>")
+        out.append("</table>")
+        return "".join(out)
+
+
+def wikitext_to_html(text: str) -> str:
+    """Convert every top-level ``{| ... |}`` table in ``text`` to HTML.
+
+    Nested tables are kept as raw text inside their parent cell.
+    """
+    tables: List[str] = []
+    table: Optional[_Table] = None
+    nested = 0
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+
+        if table is None:
+            if line.startswith("{|"):
+                table = _Table(_parse_attrs(line[2:]))
+            continue
+
+        if nested:
+            if line.startswith("{|"):
+                nested += 1
+            elif line.startswith("|}"):
+                nested -= 1
+            table.append_text(line)
+            continue
+
+        if line.startswith("{|"):
+            nested = 1
+            table.append_text(line)
+        elif line.startswith("|}"):
+            tables.append(table.to_html())
+            table = None
+        elif line.startswith("|+"):
+            table.caption = line[2:].strip()
+        elif line.startswith("|-"):
+            table.rows.append([])
+        elif line.startswith("!"):
+            table.add_cells("th", line[1:].replace("||", "!!"), "!!")
+        elif line.startswith("|"):
+            table.add_cells("td", line[1:], "||")
+        elif line:
+            table.append_text(line)
+
+    return "<html><body>" + "".join(tables) + "</body></html>"
+
+
+def fetch_wikitext_batch(slugs: Sequence[str]) -> Dict[str, str]:
+    """Return slug -> page source for up to ``QUERY_BATCH_SIZE`` slugs."""
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "revisions",
+        "rvprop": "content",
+        "rvslots": "main",
+        "redirects": "1",
+        "titles": "|".join(slug_to_title(slug) for slug in slugs),
+    }
+    data = json.loads(fetch_html(api_url() + "?" + urlencode(params)))
+    query = data.get("query", {})
+
+    content = {}
+    for page in query.get("pages", []):
+        revisions = page.get("revisions")
+        if revisions:
+            content[page["title"]] = revisions[0]["slots"]["main"]["content"]
+
+    return {
+        slug: content[title]
+        for slug, title in resolve_titles(query, slugs).items()
+        if title in content
+    }
+
+
+def run_jobs_wikitext(
+    jobs: Sequence[CrawlJob],
+    workers: int = 1,
+    on_result: Optional[Callable[[CrawlJob, Any], None]] = None,
+) -> List[Any]:
+    """Drop-in replacement for ``base.run_jobs`` parsing page source."""
+    results: List[Any] = [None] * len(jobs)
+    fallback: List[int] = []
+
+    for start in range(0, len(jobs), QUERY_BATCH_SIZE):
+        batch = jobs[start:start + QUERY_BATCH_SIZE]
+        print(f"[INFO] Fetching wikitext of {len(batch)} pages via api.php")
+        try:
+            sources = fetch_wikitext_batch([job.slug for job in batch])
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch wikitext batch: {e}")
+            fallback.extend(range(start, start + len(batch)))
+            continue
+        sleep_between_requests()
+
+        for offset, job in enumerate(batch):
+            source = sources.get(job.slug)
+            if source is None:
+                print(f"[WARN] {job.name}: page missing from api.php response, skipping")
+                continue
+            tables_html = wikitext_to_html(source)
+            if "<table" not in tables_html:
+                fallback.append(start + offset)
+                continue
+            try:
+                result = job.parse(tables_html, *job.args)
+            except Exception as e:
+                print(f"[ERROR] Failed to parse {job.name}: {e}")
+                result = None
+            # Tables built by templates or transclusion do not convert;
+            # the rendered page has them expanded.
+            if not result:
+                fallback.append(start + offset)
+                continue
+            results[start + offset] = result
+            if on_result is not None:
+                on_result(job, result)
+
+    if fallback:
+        print(f"[INFO] {len(fallback)} pages have no usable table markup, fetching rendered HTML")
+        fallback_results = run_jobs(
+            [jobs[i] for i in fallback],
+            workers=workers,
+            on_result=on_result,
+        )
+        for i, result in zip(fallback, fallback_results):
+            results[i] = result
+
+    return results
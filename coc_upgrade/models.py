@@ -16,6 +16,10 @@ class UpgradeRecord:
     builder_time: str = ""
     lab_time: str = ""
     
+    # The same durations in seconds, for sums and sorting.
+    builder_seconds: int = 0
+    lab_seconds: int = 0
+    
     count: Optional[int] = None
     
     lab_level_required: Optional[int] = None
@@ -1,106 +1,291 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Optional
-import pandas as pd
+from typing import Any, Callable, Iterable, List, Dict, Optional, Sequence, Tuple
 
 from ..models import UpgradeRecord
-from .normalize import load_and_normalize, filter_by_th
+from .normalize import normalize_rows
+from ..crawler.base import find_raw_file, format_duration, read_records
 from ..crawler.building_max_counts import load_max_counts
 
 
-def build_category_table(
+COLUMN_NAMES = {
+    "name": "Name",
+    "level": "Level",
+    "town_hall": "TownHall",
+    "gold": "Gold",
+    "elixir": "Elixir",
+    "dark_elixir": "DE",
+    "builder_time": "Builder_Time",
+    "lab_time": "Lab_Time",
+    "count": "Count",
+}
+
+
+@dataclass(frozen=True)
+class WorkbookTask:
+    """One workbook to write: its rows are snapshotted when it is planned."""
+    category_name: str
+    output_file: Path
+    rows: List[Dict[str, Any]]
+
+
+def fill_counts(records: List[UpgradeRecord], max_counts: Dict[tuple, int], town_hall: int) -> None:
+    for record in records:
+        if record.count is None:
+            key = (town_hall, record.name)
+            if key in max_counts:
+                record.count = max_counts[key]
+            else:
+                for (th, bname), count in max_counts.items():
+                    if th == town_hall and bname.lower() == record.name.lower():
+                        record.count = count
+                        break
+
+
+def prepare_category_table(
     records: List[UpgradeRecord],
     category_name: str,
     output_file: Path,
     max_counts: Optional[Dict[tuple, int]] = None,
     town_hall: Optional[int] = None
-) -> None:
+) -> Optional[WorkbookTask]:
     if not records:
         print(f"[WARN] No data for category {category_name}, skipping")
-        return
+        return None
     
     if max_counts is not None and town_hall is not None:
-        for record in records:
-            if record.count is None:
-                key = (town_hall, record.name)
-                if key in max_counts:
-                    record.count = max_counts[key]
-                else:
-                    for (th, bname), count in max_counts.items():
-                        if th == town_hall and bname.lower() == record.name.lower():
-                            record.count = count
-                            break
-    
-    rows = [r.to_dict() for r in records]
-    df = pd.DataFrame(rows)
-    
-    df = df.rename(columns={
-        "name": "Name",
-        "level": "Level",
-        "town_hall": "TownHall",
-        "gold": "Gold",
-        "elixir": "Elixir",
-        "dark_elixir": "DE",
-        "builder_time": "Builder_Time",
-        "lab_time": "Lab_Time",
-        "count": "Count",
-    })
-    
-    columns_order = [
-        "Name", "Level", "TownHall", "Gold", "Elixir", "DE",
-        "Builder_Time", "Lab_Time", "Count"
-    ]
+        fill_counts(records, max_counts, town_hall)
+    
+    return WorkbookTask(category_name, output_file, [r.to_dict() for r in records])
+
+
+def _write_pandas(task: WorkbookTask) -> int:
+    import pandas as pd
+    
+    df = pd.DataFrame(task.rows)
+    
+    df = df.rename(columns=COLUMN_NAMES)
+    
+    columns_order = list(COLUMN_NAMES.values())
     df = df[columns_order]
     
     df = df.sort_values(by=["Name", "Level"]).reset_index(drop=True)
     
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(output_file, index=False)
-    print(f"[OK] Saved: {output_file} ({len(df)} rows)")
+    df.to_excel(task.output_file, index=False)
+    return len(df)
+
+
+def _write_streaming(task: WorkbookTask) -> int:
+    # Rows go straight into a write-only workbook, which keeps only the
+    # current row in memory. Header text, cell values and types match the
+    # pandas engine; the header row is left unstyled (pandas 2 bolds and
+    # borders it).
+    from openpyxl import Workbook
+    
+    fields = list(COLUMN_NAMES)
+    rows = sorted(task.rows, key=itemgetter("name", "level"))
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(COLUMN_NAMES.values()))
+    for row in rows:
+        sheet.append([row[field] for field in fields])
+    workbook.save(task.output_file)
+    return len(rows)
+
+
+# Engine name -> workbook writer.
+WORKBOOK_ENGINES: Dict[str, Callable[[WorkbookTask], int]] = {
+    "pandas": _write_pandas,
+    "openpyxl": _write_streaming,
+}
+
+DEFAULT_ENGINE = "pandas"
+
+
+def write_workbook(task: WorkbookTask, engine: str = DEFAULT_ENGINE) -> int:
+    """Write one workbook; returns its row count. Runs in pool workers."""
+    task.output_file.parent.mkdir(parents=True, exist_ok=True)
+    return WORKBOOK_ENGINES[engine](task)
+
+
+def write_workbooks(
+    tasks: Sequence[WorkbookTask],
+    jobs: int = 1,
+    engine: str = DEFAULT_ENGINE
+) -> List[Tuple[Path, str]]:
+    """Write every workbook with ``engine``, ``jobs`` at a time in a process pool.
+
+    A failed workbook does not stop the others; failures are returned as
+    ``(output_file, error)`` and summarized at the end. Progress is printed
+    in task order whatever order the workers finish in.
+    """
+    failures: List[Tuple[Path, str]] = []
+    
+    def report(task: WorkbookTask, result: Callable[[], int]) -> None:
+        try:
+            rows = result()
+        except Exception as e:
+            failures.append((task.output_file, f"{type(e).__name__}: {e}"))
+            print(f"[ERROR] Failed to write {task.output_file}: {e}")
+            return
+        print(f"[OK] Saved: {task.output_file} ({rows} rows)")
+    
+    if jobs <= 1:
+        for task in tasks:
+            report(task, partial(write_workbook, task, engine))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(write_workbook, task, engine) for task in tasks]
+            for task, future in zip(tasks, futures):
+                report(task, future.result)
+    
+    if failures:
+        print(f"[ERROR] {len(failures)} of {len(tasks)} workbooks failed:")
+        for output_file, error in failures:
+            print(f"[ERROR]   {output_file}: {error}")
+    return failures
+
+
+def upgrade_totals(records: Iterable[UpgradeRecord]) -> Tuple[int, int]:
+    """Summed builder and lab seconds; building upgrades count once per copy."""
+    builder_seconds = 0
+    lab_seconds = 0
+    for record in records:
+        copies = record.count if record.count is not None else 1
+        builder_seconds += record.builder_seconds * copies
+        lab_seconds += record.lab_seconds
+    return builder_seconds, lab_seconds
+
+
+def build_category_table(
+    records: List[UpgradeRecord],
+    category_name: str,
+    output_file: Path,
+    max_counts: Optional[Dict[tuple, int]] = None,
+    town_hall: Optional[int] = None,
+    engine: str = DEFAULT_ENGINE
+) -> None:
+    task = prepare_category_table(records, category_name, output_file, max_counts, town_hall)
+    if task is not None:
+        rows = write_workbook(task, engine)
+        print(f"[OK] Saved: {output_file} ({rows} rows)")
+
+
+RAW_CATEGORIES = [
+    "defenses",
+    "resources",
+    "army_buildings",
+    "troops_elixir",
+    "troops_dark",
+    "spells_elixir",
+    "spells_dark",
+    "heroes",
+    "siege_machines",
+]
+
+
+def load_records_by_th(
+    raw_data_dir: Path
+) -> Tuple[Dict[int, Dict[str, List[UpgradeRecord]]], List[str]]:
+    """Load and normalize every raw category once, grouped by Town Hall.
+
+    Returns the groups and the categories that loaded.
+    """
+    by_th: Dict[int, Dict[str, List[UpgradeRecord]]] = {}
+    loaded_categories: List[str] = []
+    
+    for category_key in RAW_CATEGORIES:
+        raw_file = find_raw_file(raw_data_dir, category_key)
+        if raw_file is None:
+            print(f"[WARN] Missing file: {raw_data_dir / category_key}.json(l), skipping")
+            continue
+        
+        try:
+            records = normalize_rows(read_records(raw_file))
+            grouped: Dict[int, List[UpgradeRecord]] = {}
+            for record in records:
+                grouped.setdefault(record.town_hall, []).append(record)
+        except Exception as e:
+            print(f"[ERROR] Failed to process {raw_file}: {e}")
+            continue
+        
+        loaded_categories.append(category_key)
+        for th, records in grouped.items():
+            by_th.setdefault(th, {})[category_key] = records
+        print(f"[INFO] {category_key}: loaded {len(records)} rows for {len(grouped)} Town Hall levels")
+    
+    return by_th, loaded_categories
 
 
 def build_th_tables(
     raw_data_dir: Path,
     output_dir: Path,
-    town_hall: int
-) -> None:
-    th_dir = output_dir / f"TH{town_hall}"
-    th_dir.mkdir(parents=True, exist_ok=True)
-    
+    town_hall: int,
+    jobs: int = 1,
+    engine: str = DEFAULT_ENGINE
+) -> List[Tuple[Path, str]]:
+    return build_all_th_tables(raw_data_dir, output_dir, [town_hall], jobs=jobs, engine=engine)
+
+
+def build_all_th_tables(
+    raw_data_dir: Path,
+    output_dir: Path,
+    town_halls: Optional[Iterable[int]] = None,
+    jobs: int = 1,
+    engine: str = DEFAULT_ENGINE
+) -> List[Tuple[Path, str]]:
+    """Write ``TH{n}/`` for every level in ``town_halls`` from a single load.
+
+    With ``town_halls=None`` every Town Hall level found in the data is built.
+    The workbooks of all levels are written by ``engine``, ``jobs`` at a
+    time; returns the ones that failed.
+    """
     max_counts_file = raw_data_dir / "building_max_counts.json"
     max_counts = load_max_counts(max_counts_file) if max_counts_file.exists() else {}
     if max_counts:
         print(f"[INFO] Loaded max building counts ({len(max_counts)} entries)")
     
-    category_files = {
-        "defenses.json": ("defenses", "defenses.xlsx"),
-        "resources.json": ("resources", "resources.xlsx"),
-        "army_buildings.json": ("army_buildings", "army_buildings.xlsx"),
-        "troops_elixir.json": ("troops_elixir", "troops.xlsx"),
-        "troops_dark.json": ("troops_dark", None),
-        "spells_elixir.json": ("spells_elixir", "spells.xlsx"),
-        "spells_dark.json": ("spells_dark", None),
-        "heroes.json": ("heroes", "heroes.xlsx"),
-        "siege_machines.json": ("siege_machines", "siege_machines.xlsx"),
-    }
-    
-    all_records: Dict[str, List[UpgradeRecord]] = {}
-    
-    for json_file_name, (category_key, _) in category_files.items():
-        json_file = raw_data_dir / json_file_name
-        if not json_file.exists():
-            print(f"[WARN] Missing file: {json_file}, skipping")
-            continue
-        
-        try:
-            records = load_and_normalize(json_file)
-            filtered = filter_by_th(records, town_hall)
-            all_records[category_key] = filtered
-            print(f"[INFO] {category_key}: loaded {len(records)} rows, {len(filtered)} after TH filter")
-        except Exception as e:
-            print(f"[ERROR] Failed to process {json_file}: {e}")
+    by_th, loaded_categories = load_records_by_th(raw_data_dir)
+    if town_halls is None:
+        # 0 collects rows whose Town Hall could not be determined.
+        town_halls = sorted(th for th in by_th if th > 0)
+    
+    tasks: List[WorkbookTask] = []
+    for town_hall in town_halls:
+        groups = by_th.get(town_hall, {})
+        all_records = {category: groups.get(category, []) for category in loaded_categories}
+        print(f"[INFO] TH{town_hall}: {sum(len(r) for r in all_records.values())} rows")
+        tasks.extend(plan_th_tables(output_dir / f"TH{town_hall}", town_hall, all_records, max_counts))
+        builder_seconds, lab_seconds = upgrade_totals(r for records in all_records.values() for r in records)
+        print(
+            f"[INFO] TH{town_hall}: total builder time {format_duration(builder_seconds)}, "
+            f"lab time {format_duration(lab_seconds)}"
+        )
+    
+    return write_workbooks(tasks, jobs=jobs, engine=engine)
+
+
+def plan_th_tables(
+    th_dir: Path,
+    town_hall: int,
+    all_records: Dict[str, List[UpgradeRecord]],
+    max_counts: Dict[tuple, int]
+) -> List[WorkbookTask]:
+    """The workbooks of one ``TH{n}/`` directory, in the order they are written."""
+    th_dir.mkdir(parents=True, exist_ok=True)
+    tasks: List[WorkbookTask] = []
+    
+    def add(*args, **kwargs) -> None:
+        task = prepare_category_table(*args, **kwargs)
+        if task is not None:
+            tasks.append(task)
     
     if "defenses" in all_records:
-        build_category_table(
+        add(
             all_records["defenses"],
             "defenses",
             th_dir / "defenses.xlsx",
@@ -109,7 +294,7 @@ def build_th_tables(
         )
     
     if "resources" in all_records:
-        build_category_table(
+        add(
             all_records["resources"],
             "resources",
             th_dir / "resources.xlsx",
@@ -118,7 +303,7 @@ def build_th_tables(
         )
     
     if "army_buildings" in all_records:
-        build_category_table(
+        add(
             all_records["army_buildings"],
             "army_buildings",
             th_dir / "army_buildings.xlsx",
@@ -132,7 +317,7 @@ def build_th_tables(
     if "troops_dark" in all_records:
         troops_all.extend(all_records["troops_dark"])
     if troops_all:
-        build_category_table(
+        add(
             troops_all,
             "troops",
             th_dir / "troops.xlsx",
@@ -146,7 +331,7 @@ def build_th_tables(
     if "spells_dark" in all_records:
         spells_all.extend(all_records["spells_dark"])
     if spells_all:
-        build_category_table(
+        add(
             spells_all,
             "spells",
             th_dir / "spells.xlsx",
@@ -158,7 +343,7 @@ def build_th_tables(
         for record in all_records["heroes"]:
             if record.count is None:
                 record.count = 1
-        build_category_table(
+        add(
             all_records["heroes"],
             "heroes",
             th_dir / "heroes.xlsx",
@@ -170,7 +355,7 @@ def build_th_tables(
         for record in all_records["siege_machines"]:
             if record.count is None:
                 record.count = 1
-        build_category_table(
+        add(
             all_records["siege_machines"],
             "siege_machines",
             th_dir / "siege_machines.xlsx",
@@ -183,10 +368,12 @@ def build_th_tables(
         all_merged.extend(records)
     
     if all_merged:
-        build_category_table(
+        add(
             all_merged,
             "all_merged",
             th_dir / "all_merged.xlsx",
             max_counts=max_counts,
             town_hall=town_hall
         )
+    
+    return tasks
@@ -1,13 +1,16 @@
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Sequence
 from pathlib import Path
-import json
 
 from ..models import UpgradeRecord
 from .mappings import lab_level_to_th, hero_hall_to_th
-from ..crawler.base import parse_time_to_str
+from ..crawler.base import parse_time_to_str, parse_time_to_seconds, read_records
 
 
-def normalize_raw_data(raw_data: Dict[str, Any]) -> UpgradeRecord:
+def normalize_raw_data(
+    raw_data: Dict[str, Any],
+    builder_seconds: Optional[int] = None,
+    lab_seconds: Optional[int] = None
+) -> UpgradeRecord:
     town_hall = 0
     if raw_data.get("town_hall_required"):
         town_hall = raw_data["town_hall_required"]
@@ -16,8 +19,12 @@ def normalize_raw_data(raw_data: Dict[str, Any]) -> UpgradeRecord:
     elif raw_data.get("hero_hall_level_required"):
         town_hall = hero_hall_to_th(raw_data["hero_hall_level_required"])
     
-    builder_time = parse_time_to_str(raw_data.get("builder_time_raw", ""))
-    lab_time = parse_time_to_str(raw_data.get("lab_time_raw", ""))
+    builder_time_raw = raw_data.get("builder_time_raw", "")
+    lab_time_raw = raw_data.get("lab_time_raw", "")
+    if builder_seconds is None:
+        builder_seconds = parse_time_to_seconds(builder_time_raw)
+    if lab_seconds is None:
+        lab_seconds = parse_time_to_seconds(lab_time_raw)
     
     return UpgradeRecord(
         name=raw_data["name"],
@@ -26,21 +33,49 @@ def normalize_raw_data(raw_data: Dict[str, Any]) -> UpgradeRecord:
         gold=raw_data.get("gold", 0),
         elixir=raw_data.get("elixir", 0),
         dark_elixir=raw_data.get("dark_elixir", 0),
-        builder_time=builder_time,
-        lab_time=lab_time,
+        builder_time=parse_time_to_str(builder_time_raw),
+        lab_time=parse_time_to_str(lab_time_raw),
+        builder_seconds=builder_seconds,
+        lab_seconds=lab_seconds,
         count=None,
         lab_level_required=raw_data.get("lab_level_required"),
         hero_hall_level_required=raw_data.get("hero_hall_level_required"),
     )
 
 
-def load_and_normalize(json_file: Path) -> List[UpgradeRecord]:
-    with open(json_file, "r", encoding="utf-8") as f:
-        raw_data_list = json.load(f)
-    
-    return [normalize_raw_data(raw_data) for raw_data in raw_data_list]
+def parse_times_to_seconds(values: Sequence[str]) -> List[int]:
+    """Parse a whole column of wiki time strings into seconds.
+
+    Each distinct string is parsed once and its result reused for every
+    repeat, so a column of thousands of rows costs a few hundred parses.
+    """
+    parsed: Dict[str, int] = {}
+    seconds = []
+    for text in values:
+        text = text or ""
+        if text not in parsed:
+            parsed[text] = parse_time_to_seconds(text)
+        seconds.append(parsed[text])
+    return seconds
+
+
+def normalize_rows(rows: Iterable[Dict[str, Any]]) -> List[UpgradeRecord]:
+    """Normalize a whole category, parsing each time column in one pass."""
+    rows = list(rows)
+    builder_seconds = parse_times_to_seconds([r.get("builder_time_raw", "") for r in rows])
+    lab_seconds = parse_times_to_seconds([r.get("lab_time_raw", "") for r in rows])
+    return [
+        normalize_raw_data(raw_data, builder, lab)
+        for raw_data, builder, lab in zip(rows, builder_seconds, lab_seconds)
+    ]
+
+
+def load_and_normalize(raw_file: Path) -> Iterator[UpgradeRecord]:
+    """Yield records of a raw category file; ``.jsonl`` files are read line by line."""
+    for raw_data in read_records(raw_file):
+        yield normalize_raw_data(raw_data)
 
 
-def filter_by_th(records: List[UpgradeRecord], town_hall: int) -> List[UpgradeRecord]:
+def filter_by_th(records: Iterable[UpgradeRecord], town_hall: int) -> List[UpgradeRecord]:
     return [r for r in records if r.town_hall == town_hall]
 
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Crawl a local mock wiki of any size and report throughput and memory."""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from coc_upgrade.cli import FETCH_BACKENDS
+from coc_upgrade.crawler import base
+from coc_upgrade.crawler.base import TokenBucket
+from coc_upgrade.crawler.mockwiki import MockWikiConfig, load_test
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=1000, help="Synthetic entities per category")
+    parser.add_argument("--backend", choices=["html", "pipeline"], default="html")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="Requests per second (default: 0, unlimited)")
+    parser.add_argument("--adaptive-pacing", action="store_true")
+    parser.add_argument("--max-rate", type=float, default=50.0)
+    parser.add_argument("--levels", type=int, default=10)
+    parser.add_argument("--page-kb", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    if args.adaptive_pacing:
+        base.enable_adaptive_pacing(max_rate=args.max_rate)
+    elif args.rate > 0:
+        base.set_rate_limiter_factory(lambda host: TokenBucket(rate=args.rate))
+    else:
+        base.set_throttle(False)
+    
+    config = MockWikiConfig(
+        entities=args.entities,
+        levels=args.levels,
+        page_kb=args.page_kb,
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        slow_rate=args.slow_rate,
+        slow_seconds=args.slow_seconds,
+    )
+    report = load_test(config, FETCH_BACKENDS[args.backend], workers=args.workers)
+    print(json.dumps(report, indent=2))